@@ -1,7 +1,7 @@
 import numpy as np
 import networkx as nx
 from collections import defaultdict
-from itertools import product
+import instrumentation
 
 class GridSnapper:
     def __init__(self, graph, positions, width, height):
@@ -12,6 +12,84 @@ class GridSnapper:
         self.snapped_positions = set()  # Track snapped positions to avoid overlaps
         self.edges = list(self.G.edges())  # Store all edges for edge collision checks
 
+        # Plain float copies of the positions for the per-edge arithmetic
+        self.xy = {node: (float(p[0]), float(p[1])) for node, p in self.pos.items()}
+
+        # Edges touching each node, re-indexed whenever the node moves
+        self.incident = defaultdict(list)
+        for i, (u, v) in enumerate(self.edges):
+            self.incident[u].append(i)
+            if v != u:
+                self.incident[v].append(i)
+
+        # Spatial index of edges: bucket cell -> edges passing near it, so a
+        # legality check only looks at edges close to the candidate point
+        lengths = [np.hypot(self.xy[v][0] - self.xy[u][0], self.xy[v][1] - self.xy[u][1])
+                   for u, v in self.edges]
+        self.cell_size = max(1.0, float(np.mean(lengths))) if lengths else 1.0
+        self.edge_buckets = defaultdict(set)
+        self.edge_cells = {}
+        for i in range(len(self.edges)):
+            self._index_edge(i)
+
+    def _cell(self, point):
+        return int(point[0] // self.cell_size), int(point[1] // self.cell_size)
+
+    def _edge_raster(self, u_pos, v_pos):
+        # Cut the segment into pieces no longer than a cell and take the cells
+        # of each piece's bounding box; every point of the segment then falls
+        # in one of the returned cells
+        x1, y1 = u_pos
+        x2, y2 = v_pos
+        size = self.cell_size
+        pieces = int(np.hypot(x2 - x1, y2 - y1) / size) + 1
+        eps = 1e-9 * size
+        cells = set()
+        for k in range(pieces):
+            ax, ay = x1 + k / pieces * (x2 - x1), y1 + k / pieces * (y2 - y1)
+            bx, by = x1 + (k + 1) / pieces * (x2 - x1), y1 + (k + 1) / pieces * (y2 - y1)
+            for cx in range(int((min(ax, bx) - eps) // size), int((max(ax, bx) + eps) // size) + 1):
+                for cy in range(int((min(ay, by) - eps) // size), int((max(ay, by) + eps) // size) + 1):
+                    cells.add((cx, cy))
+        return cells
+
+    def _index_edge(self, i):
+        u, v = self.edges[i]
+        cells = self._edge_raster(self.xy[u], self.xy[v])
+        for cell in cells:
+            self.edge_buckets[cell].add(i)
+        self.edge_cells[i] = cells
+
+    def _unindex_edge(self, i):
+        for cell in self.edge_cells.pop(i):
+            bucket = self.edge_buckets[cell]
+            bucket.discard(i)
+            if not bucket:
+                del self.edge_buckets[cell]
+
+    def _place(self, node, position):
+        # Move a node to its snapped position and keep both indexes current
+        for i in self.incident[node]:
+            self._unindex_edge(i)
+        self.pos[node] = position
+        self.xy[node] = (float(position[0]), float(position[1]))
+        for i in self.incident[node]:
+            self._index_edge(i)
+        self.snapped_positions.add(tuple(position))  # Mark this position as occupied
+
+    def add_node(self, node, position, neighbors=()):
+        # Place a node the snapper did not start with, joined by new edges
+        # to already placed neighbors
+        self.pos[node] = np.array(position)
+        self.xy[node] = (float(position[0]), float(position[1]))
+        self.snapped_positions.add(tuple(position))
+        for other in neighbors:
+            i = len(self.edges)
+            self.edges.append((node, other))
+            self.incident[node].append(i)
+            self.incident[other].append(i)
+            self._index_edge(i)
+
     def snap_to_grid(self):
         # Print initial positions
         print("Initial Positions:")
@@ -38,15 +116,13 @@ class GridSnapper:
                 node = nodes[0]
                 old_pos = self.pos[node]
                 if self.is_position_legal(snapped_pos, node):
-                    self.pos[node] = np.array(snapped_pos)  # Snap to the integer position
-                    self.snapped_positions.add(snapped_pos)  # Mark this position as occupied
+                    self._place(node, np.array(snapped_pos))  # Snap to the integer position
                     snapped_nodes_count += 1
                     print(f"SNAPPED Node {node}: {old_pos} -> {self.pos[node]}")
                 else:
                     print(f"ILLEGAL POSITION for Node {node}: {snapped_pos} - Resolving conflict.")
                     new_pos = self.find_nearest_available_position(snapped_pos, node)
-                    self.pos[node] = new_pos
-                    self.snapped_positions.add(tuple(new_pos))  # Mark this position as occupied
+                    self._place(node, new_pos)
                     snapped_nodes_count += 1
                     print(f"RESOLVED Node {node}: {old_pos} -> {new_pos}")
             else:
@@ -54,8 +130,7 @@ class GridSnapper:
                 for node in nodes:
                     new_pos = self.find_nearest_available_position(snapped_pos, node)
                     old_pos = self.pos[node]
-                    self.pos[node] = new_pos
-                    self.snapped_positions.add(tuple(new_pos))  # Mark this position as occupied
+                    self._place(node, new_pos)
                     snapped_nodes_count += 1
                     print(f"RESOLVED Node {node}: {old_pos} -> {new_pos}")
 
@@ -75,14 +150,15 @@ class GridSnapper:
         if position in self.snapped_positions:
             return False
 
-        # Check if the position lies on any edge
-        for edge in self.edges:
-            u, v = edge
+        # Check if the position lies on any edge passing near it
+        point = (float(position[0]), float(position[1]))
+        for i in self.edge_buckets.get(self._cell(point), ()):
+            u, v = self.edges[i]
             if u == node or v == node:
                 continue  # Skip edges involving the current node
-            u_pos = self.pos[u]
-            v_pos = self.pos[v]
-            if self.point_lies_on_edge(position, u_pos, v_pos):
+            u_pos = self.xy[u]
+            v_pos = self.xy[v]
+            if self.point_lies_on_edge(point, u_pos, v_pos):
                 return False
 
         return True
@@ -106,17 +182,29 @@ class GridSnapper:
 
     def find_nearest_available_position(self, desired_pos, node):
         x, y = desired_pos
-        for distance in range(1, max(self.width, self.height)):
-            # Generate all positions at the current Manhattan distance
-            for dx, dy in product(range(-distance, distance + 1), repeat=2):
-                if abs(dx) + abs(dy) == distance:
-                    new_pos = (x + dx, y + dy)
-                    if self.is_position_legal(new_pos, node):
-                        return np.array(new_pos)
+        for distance in range(1, self.width + self.height + 1):
+            # Walk the positions at the current Manhattan distance directly,
+            # keeping to the canvas
+            for dx, dy in manhattan_ring(distance):
+                new_pos = (x + dx, y + dy)
+                if not (0 <= new_pos[0] <= self.width and 0 <= new_pos[1] <= self.height):
+                    continue
+                if self.is_position_legal(new_pos, node):
+                    return np.array(new_pos)
         # If no position is found (unlikely), return the desired position
         return np.array(desired_pos)
 
 
+def manhattan_ring(distance):
+    # Offsets with |dx| + |dy| == distance, ordered by dx then dy
+    for dx in range(-distance, distance + 1):
+        dy = distance - abs(dx)
+        yield dx, -dy
+        if dy:
+            yield dx, dy
+
+
+@instrumentation.timed("snap")
 def apply_grid_snapping(graph, positions, width, height):
     print("\n--- Starting Grid Snapping ---")
     snapper = GridSnapper(graph, positions, width, height)
@@ -0,0 +1,135 @@
+import numpy as np
+
+
+class QuadTree:
+    """Point quadtree stored as flat arrays, built one level at a time.
+
+    Every cell keeps its square bounds, point count and center of mass;
+    leaves hold at most leaf_size points (more only at max_depth, where
+    coincident points end up).
+    """
+
+    def __init__(self, points, leaf_size=8, max_depth=32):
+        self.points = np.asarray(points, dtype=np.float64)
+        n = len(self.points)
+
+        low = self.points.min(axis=0)
+        high = self.points.max(axis=0)
+        half = max((high - low).max() / 2, 1e-9) * (1 + 1e-9)
+
+        centers = [(low + high) / 2]
+        halves = [half]
+        children = [np.full(4, -1, dtype=np.int64)]
+        cell_of_point = np.zeros(n, dtype=np.int64)
+
+        # Split every cell holding too many points, level by level
+        splitting = np.array([0]) if n > leaf_size else np.array([], dtype=np.int64)
+        depth = 0
+        while len(splitting) and depth < max_depth:
+            center = np.array(centers)
+            in_split = np.isin(cell_of_point, splitting)
+            members = np.flatnonzero(in_split)
+            parent = cell_of_point[members]
+            quadrant = ((self.points[members, 0] > center[parent, 0]).astype(np.int64) +
+                        2 * (self.points[members, 1] > center[parent, 1]))
+
+            keys, child_of_member = np.unique(parent * 4 + quadrant, return_inverse=True)
+            first_new = len(centers)
+            for k, key in enumerate(keys.tolist()):
+                cell, q = divmod(key, 4)
+                offset = np.array([1.0 if q & 1 else -1.0, 1.0 if q & 2 else -1.0])
+                child_half = halves[cell] / 2
+                centers.append(centers[cell] + offset * child_half)
+                halves.append(child_half)
+                children.append(np.full(4, -1, dtype=np.int64))
+                children[cell][q] = first_new + k
+            cell_of_point[members] = first_new + child_of_member
+
+            counts = np.bincount(child_of_member, minlength=len(keys))
+            splitting = first_new + np.flatnonzero(counts > leaf_size)
+            depth += 1
+
+        self.center = np.array(centers)
+        self.half = np.array(halves)
+        self.children = np.array(children).reshape(-1, 4)
+        self.is_leaf = (self.children < 0).all(axis=1)
+
+        # Mass and center of mass, accumulated from the leaves upwards
+        num_cells = len(self.half)
+        self.mass = np.bincount(cell_of_point, minlength=num_cells).astype(np.float64)
+        weighted = np.stack([np.bincount(cell_of_point, weights=self.points[:, k], minlength=num_cells)
+                             for k in range(2)], axis=1)
+        for cell in range(num_cells - 1, -1, -1):
+            for child in self.children[cell]:
+                if child >= 0:
+                    self.mass[cell] += self.mass[child]
+                    weighted[cell] += weighted[child]
+        self.com = weighted / np.maximum(self.mass, 1)[:, np.newaxis]
+
+        # Points of each leaf as a contiguous slice of order
+        self.order = np.argsort(cell_of_point, kind='stable')
+        self.leaf_start = np.searchsorted(cell_of_point[self.order], np.arange(num_cells), side='left')
+        self.leaf_end = np.searchsorted(cell_of_point[self.order], np.arange(num_cells), side='right')
+
+
+def _expand(counts):
+    # Offsets 0..count-1 for every entry, flattened
+    return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+
+def barnes_hut_repulsion(points, theta=0.5, leaf_size=8):
+    """Approximate sum over v != u of (p_u - p_v) / |p_u - p_v|^2 for every u.
+
+    A cell is replaced by its center of mass when its width divided by the
+    distance to that center is below theta and u lies outside it; theta=0
+    gives the exact sum.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    total = np.zeros_like(points)
+    if n < 2:
+        return total
+    tree = QuadTree(points, leaf_size)
+
+    def accumulate(p, diff):
+        dist_sq = np.einsum('ij,ij->i', diff, diff)
+        dist_sq[dist_sq == 0] = np.inf
+        return p, diff / dist_sq[:, np.newaxis]
+
+    # Frontier of (point, cell) pairs still to resolve, starting at the root
+    p = np.arange(n)
+    c = np.zeros(n, dtype=np.int64)
+    while len(p):
+        diff = points[p] - tree.com[c]
+        dist_sq = np.einsum('ij,ij->i', diff, diff)
+        width = 2 * tree.half[c]
+        outside = (np.abs(points[p] - tree.center[c]) > tree.half[c][:, np.newaxis]).any(axis=1)
+        far = outside & (width * width < theta * theta * dist_sq)
+
+        # Far cells act as one mass at their center of mass
+        fp, contribution = accumulate(p[far], diff[far])
+        contribution *= tree.mass[c[far], np.newaxis]
+        for k in range(2):
+            total[:, k] += np.bincount(fp, weights=contribution[:, k], minlength=n)
+
+        near = ~far
+        p, c = p[near], c[near]
+        leaf = tree.is_leaf[c]
+
+        # Near leaves are summed exactly over their points
+        lp, lc = p[leaf], c[leaf]
+        counts = tree.leaf_end[lc] - tree.leaf_start[lc]
+        other = tree.order[np.repeat(tree.leaf_start[lc], counts) + _expand(counts)]
+        lp = np.repeat(lp, counts)
+        lp, contribution = accumulate(lp, points[lp] - points[other])
+        for k in range(2):
+            total[:, k] += np.bincount(lp, weights=contribution[:, k], minlength=n)
+
+        # Near internal cells are opened into their children
+        ip, ic = p[~leaf], c[~leaf]
+        kids = tree.children[ic].ravel()
+        ip = np.repeat(ip, 4)
+        exists = kids >= 0
+        p, c = ip[exists], kids[exists]
+
+    return total
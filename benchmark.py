@@ -0,0 +1,205 @@
+import argparse
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import numpy as np
+import instrumentation
+import layout_cache
+from crossing_utils import KERNEL_TILE_SIZE, all_pair_blocks, edge_crossing_counts, edge_pairs_cross, \
+    edge_segments, exact_coordinates
+from kamada_gradient import GradientLayoutDrawer
+from main import find_graph_files, peak_memory_mb
+from simluated_annealing import SimulatedAnnealingDrawer
+
+# Graph corpora shipped with the repository
+CORPORA = ["benchmark_small", "benchmark_2024", "intermediate_benchmark", "final_graphs"]
+PIPELINES = ["anneal", "gradient"]
+
+RESULT_FIELDS = ["graph", "pipeline", "nodes", "edges", "seed_s", "gradient_s", "anneal_s", "snap_s",
+                 "total_s", "kernel_pairs_per_s", "max_crossings", "total_crossings", "peak_rss_mb"]
+
+# Edge pairs pushed through the crossing kernel to measure its throughput
+KERNEL_SAMPLE_PAIRS = 4 * KERNEL_TILE_SIZE
+
+# Above this many nodes the gradient pipeline uses Barnes-Hut repulsion
+BARNES_HUT_MIN_NODES = 1000
+
+# Instrumentation phases summed into each timing column. Nested phases
+# count in every column they fall under, e.g. the annealing of the
+# coarsest graph inside multilevel seeding in both seed and anneal
+PHASE_COLUMNS = {"seed": ("planar", "seed"), "gradient": ("gradient",), "anneal": ("anneal",), "snap": ("snap",)}
+
+
+def _kernel_throughput(edges, coords):
+    # Edge pairs per second through the batched intersection kernel
+    coords = exact_coordinates(coords)
+    segments = edge_segments(edges[:, 0].astype(np.int64), edges[:, 1].astype(np.int64), coords)
+    pairs = 0
+    start = time.perf_counter()
+    for i, j in all_pair_blocks(len(edges), KERNEL_TILE_SIZE):
+        edge_pairs_cross(segments, i, j)
+        pairs += len(i)
+        if pairs >= KERNEL_SAMPLE_PAIRS:
+            break
+    elapsed = time.perf_counter() - start
+    return pairs / elapsed if elapsed > 0 else 0.0
+
+
+def run_pipeline(file_path, pipeline, seed=0, iterations=None, use_layout_cache=False):
+    """Run one pipeline on one graph with fixed seeds and return its measurements.
+
+    The drawers run exactly as main.py runs them; the time spent in each
+    phase comes from the instrumentation phases in PHASE_COLUMNS.
+    """
+    # Seeding is timed from scratch unless cached layouts are asked for
+    if not use_layout_cache:
+        layout_cache.CACHE_DIR = ""
+    random.seed(seed)
+    np.random.seed(seed)
+    with open(file_path, 'r') as file:
+        graph_data = json.load(file)
+
+    instrumentation.reset()
+    instrumentation.enable()
+    start_time = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if pipeline == "anneal":
+            drawer = SimulatedAnnealingDrawer(graph_data, max_iterations=iterations or 1000, run=False)
+            drawer.solve()
+            coords = drawer.core.coords
+        elif pipeline == "gradient":
+            repulsion = "barnes_hut" if len(graph_data["nodes"]) > BARNES_HUT_MIN_NODES else "exact"
+            drawer = GradientLayoutDrawer(graph_data, max_iter=iterations or 100, repulsion=repulsion, render=False)
+            coords = np.array([drawer.pos[node] for node in drawer.core.node_ids], dtype=np.float64)
+        else:
+            raise ValueError(f"Unknown pipeline: {pipeline}")
+    total_time = time.perf_counter() - start_time
+    phases = instrumentation.report()["phases"]
+    instrumentation.disable()
+
+    core = drawer.core
+    counts = edge_crossing_counts(core.edges[:, 0], core.edges[:, 1], coords)
+    row = {
+        "graph": file_path,
+        "pipeline": pipeline,
+        "nodes": core.num_nodes,
+        "edges": core.num_edges,
+        "total_s": round(total_time, 4),
+        "kernel_pairs_per_s": round(_kernel_throughput(core.edges, coords)),
+        "max_crossings": int(counts.max()) if len(counts) else 0,
+        "total_crossings": int(counts.sum()) // 2,
+        "peak_rss_mb": peak_memory_mb(),
+    }
+    for column, names in PHASE_COLUMNS.items():
+        times = [phases[name]["total_s"] for name in names if name in phases]
+        row[f"{column}_s"] = round(sum(times), 4) if times else None
+    return row
+
+
+def _run_task(task):
+    return run_pipeline(*task)
+
+
+def read_rows(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def write_rows(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({field: row.get(field) for field in RESULT_FIELDS})
+
+
+def find_regressions(rows, baseline_rows, tolerance, time_tolerance=None):
+    """Compare results with the baseline and describe every regression.
+
+    Crossing counts may grow by the relative tolerance (and at least one
+    crossing); runtimes are only checked when time_tolerance is given.
+    """
+    baseline = {(row["graph"], row["pipeline"]): row for row in baseline_rows}
+    regressions = []
+    for row in rows:
+        reference = baseline.get((row["graph"], row["pipeline"]))
+        if reference is None:
+            continue
+        for field in ("max_crossings", "total_crossings"):
+            allowed = float(reference[field])
+            allowed += max(1.0, allowed * tolerance)
+            if row[field] > allowed:
+                regressions.append(f"{row['graph']} [{row['pipeline']}] {field}: "
+                                   f"{row[field]} > baseline {reference[field]}")
+        if time_tolerance is not None and reference.get("total_s"):
+            allowed = float(reference["total_s"]) * (1 + time_tolerance)
+            if row["total_s"] > allowed:
+                regressions.append(f"{row['graph']} [{row['pipeline']}] total_s: "
+                                   f"{row['total_s']} > baseline {reference['total_s']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the layout pipelines over the graph corpora.")
+    parser.add_argument("paths", nargs="*", default=CORPORA, help="corpus directories or graph files")
+    parser.add_argument("--pipelines", nargs="+", default=PIPELINES, choices=PIPELINES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="annealing/gradient iterations (default: the drawers' defaults)")
+    parser.add_argument("--max-nodes", type=int, default=None, help="skip graphs with more nodes")
+    parser.add_argument("--layout-cache", action="store_true",
+                        help="reuse cached seed layouts instead of timing them from scratch")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parallel graphs; keep at 1 for comparable timings")
+    parser.add_argument("--results", default="benchmark_results.csv")
+    parser.add_argument("--baseline", default="benchmark_baseline.csv")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="allowed relative crossing increase")
+    parser.add_argument("--time-tolerance", type=float, default=None,
+                        help="allowed relative runtime increase (runtimes unchecked if omitted)")
+    args = parser.parse_args()
+
+    files = find_graph_files(args.paths)
+    if args.max_nodes is not None:
+        def small_enough(path):
+            with open(path, 'r') as f:
+                return len(json.load(f)["nodes"]) <= args.max_nodes
+        files = [f for f in files if small_enough(f)]
+    tasks = [(f, pipeline, args.seed, args.iterations, args.layout_cache)
+             for f in files for pipeline in args.pipelines]
+
+    # Every run gets a fresh process so peak RSS is measured per graph
+    rows = []
+    with multiprocessing.Pool(args.workers, maxtasksperchild=1) as pool:
+        for row in pool.imap(_run_task, tasks):
+            rows.append(row)
+            print(f"{row['graph']} [{row['pipeline']}]: max {row['max_crossings']}, "
+                  f"total {row['total_crossings']}, {row['total_s']:.2f}s, "
+                  f"{row['kernel_pairs_per_s'] / 1e6:.1f}M pairs/s, {row['peak_rss_mb']:.0f} MB")
+    write_rows(rows, args.results)
+    print(f"Results written to {args.results}")
+
+    if args.update_baseline:
+        write_rows(rows, args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+
+    regressions = find_regressions(rows, read_rows(args.baseline), args.tolerance, args.time_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if regressions:
+        return 1
+    print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
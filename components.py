@@ -0,0 +1,153 @@
+import contextlib
+import math
+import multiprocessing
+import os
+import random
+import time
+import numpy as np
+from scipy.sparse.csgraph import connected_components
+
+# Regions shrink by this factor until they all fit on the canvas
+PACKING_SHRINK = 0.95
+
+# Components of at most this many nodes (isolated nodes, single edges,
+# paths of three) share one region instead of taking a region each
+SHARED_REGION_MAX_NODES = 3
+
+
+def split_components(core):
+    """Node index arrays of core's connected components, largest first."""
+    count, labels = connected_components(core.adjacency_matrix(), directed=False)
+    order = np.argsort(labels, kind='stable')
+    groups = np.split(order, np.cumsum(np.bincount(labels, minlength=count))[:-1])
+    return sorted(groups, key=len, reverse=True)
+
+
+def _group_components(groups):
+    # Tiny components are pooled into one group, laid out as one graph
+    large = [nodes for nodes in groups if len(nodes) > SHARED_REGION_MAX_NODES]
+    small = [nodes for nodes in groups if len(nodes) <= SHARED_REGION_MAX_NODES]
+    if len(small) > 1:
+        small = [np.concatenate(small)]
+    return large + small
+
+
+def _shelf_pack(sizes, width, height):
+    # Tallest first, left to right on shelves; a region of size (w, h) at
+    # (x, y) spans [x, x + w - 1] x [y, y + h - 1], leaving a unit gap to
+    # its neighbours. Returns None when the regions do not fit
+    origins = [None] * len(sizes)
+    x = y = shelf_height = 0
+    for k in sorted(range(len(sizes)), key=lambda k: sizes[k][1], reverse=True):
+        w, h = sizes[k]
+        if x > 0 and x + w - 1 > width:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        if x + w - 1 > width or y + h - 1 > height:
+            return None
+        origins[k] = (x, y)
+        x += w
+        shelf_height = max(shelf_height, h)
+    return origins
+
+
+def pack_regions(weights, width, height, min_size=2):
+    """Disjoint integer regions (x, y, w, h) of the width x height canvas.
+
+    Each region keeps the canvas aspect ratio with an area about
+    proportional to its weight, scaled down until a shelf packing of all of
+    them fits. Raises ValueError when even min_size regions do not fit.
+    """
+    total = float(sum(weights))
+    scale = 1.0
+    while True:
+        sizes = [(max(min_size, int(width * scale * math.sqrt(w / total))),
+                  max(min_size, int(height * scale * math.sqrt(w / total)))) for w in weights]
+        origins = _shelf_pack(sizes, width, height)
+        if origins is not None:
+            return [(x, y, w, h) for (x, y), (w, h) in zip(origins, sizes)]
+        if all(size == (min_size, min_size) for size in sizes):
+            raise ValueError(f"{len(weights)} components do not fit on a {width} x {height} canvas")
+        scale *= PACKING_SHRINK
+
+
+def _optimize_component(task, should_stop=None):
+    # Pool worker: anneal one component on its own canvas; the annealer's
+    # progress output of many components would only interleave, so drop it
+    graph_data, options, seed = task
+    from simluated_annealing import SimulatedAnnealingDrawer
+
+    # Seeds drawn by the parent keep runs reproducible whichever worker
+    # picks up the component
+    random.seed(seed)
+    np.random.seed(seed)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        drawer = SimulatedAnnealingDrawer(graph_data, use_points=False, components=False, should_stop=should_stop,
+                                          run=False, **options)
+        drawer.solve()
+    return drawer.core.coords
+
+
+def optimize_components(core, workers=None, time_budget=None, should_stop=None, **options):
+    """Layout of core with each connected component annealed on its own region.
+
+    Components are packed into disjoint regions of the canvas, so the
+    layout has no crossings between components. The components are
+    optimized in a process pool of workers processes (serially inside
+    daemonic processes, which cannot have children), each with the
+    annealer options and a share of time_budget by its number of edges.
+    should_stop is polled by components optimized serially; pooled ones
+    only stop at their share of the budget.
+    Components of at most SHARED_REGION_MAX_NODES nodes share one region.
+    Returns None when core is connected or when the regions do not fit on
+    the canvas with a grid point for every node, so the caller can
+    optimize the graph as a whole.
+    """
+    groups = _group_components(split_components(core))
+    if len(groups) < 2:
+        return None
+    start_time = time.time()
+    try:
+        regions = pack_regions([len(nodes) for nodes in groups], core.width, core.height)
+    except ValueError as error:
+        print(f"Components: {error}; optimizing the graph as a whole")
+        return None
+    if any(w * h < len(nodes) for nodes, (_, _, w, h) in zip(groups, regions)):
+        print("Components: regions too small for their nodes; optimizing the graph as a whole")
+        return None
+
+    labels = np.empty(core.num_nodes, dtype=np.int64)
+    for k, nodes in enumerate(groups):
+        labels[nodes] = k
+    edge_label = labels[core.edges[:, 0]]
+    num_edges = np.bincount(edge_label, minlength=len(groups))
+
+    # Budget shares assume one process per component at most
+    workers = min(workers or os.cpu_count() or 1, len(groups))
+    tasks = []
+    for k, (nodes, (_, _, w, h)) in enumerate(zip(groups, regions)):
+        node_ids = [core.node_ids[i] for i in nodes.tolist()]
+        graph_data = {
+            "nodes": [{"id": node, "x": 0, "y": 0} for node in node_ids],
+            "edges": [{"source": core.node_ids[u], "target": core.node_ids[v]}
+                      for u, v in core.edges[edge_label == k].tolist()],
+            "width": w - 1,
+            "height": h - 1,
+        }
+        component_options = dict(options)
+        if time_budget is not None:
+            share = min(1.0, workers * (num_edges[k] + 1) / (len(core.edges) + len(groups)))
+            component_options["time_budget"] = time_budget * share
+        tasks.append((graph_data, component_options, random.getrandbits(32)))
+
+    if workers > 1 and not multiprocessing.current_process().daemon:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(_optimize_component, tasks, chunksize=1)
+    else:
+        results = [_optimize_component(task, should_stop) for task in tasks]
+
+    coords = np.empty((core.num_nodes, 2))
+    for nodes, (x, y, _, _), local in zip(groups, regions, results):
+        coords[nodes] = local + (x, y)
+    print(f"Components: {len(groups)} optimized on separate regions in {time.time() - start_time:.4f} seconds")
+    return coords
@@ -0,0 +1,57 @@
+import random
+
+
+class CrossingCountIndex:
+    """Bucket queue of edges keyed by crossing count with O(1) max queries."""
+
+    def __init__(self, counts):
+        self.counts = [int(count) for count in counts]
+        self.buckets = {}  # count -> edges with that count
+        self.slots = [0] * len(self.counts)  # position of each edge in its bucket
+        for edge, count in enumerate(self.counts):
+            self._insert(edge, count)
+        self.max_count = max(self.counts, default=0)
+
+    def _insert(self, edge, count):
+        bucket = self.buckets.setdefault(count, [])
+        self.slots[edge] = len(bucket)
+        bucket.append(edge)
+
+    def _remove(self, edge, count):
+        # Swap-remove keeps buckets dense so random picks stay O(1)
+        bucket = self.buckets[count]
+        slot = self.slots[edge]
+        last = bucket.pop()
+        if last != edge:
+            bucket[slot] = last
+            self.slots[last] = slot
+        if not bucket:
+            del self.buckets[count]
+
+    def update(self, edge, count):
+        count = int(count)
+        old_count = self.counts[edge]
+        if count == old_count:
+            return
+        self._remove(edge, old_count)
+        self._insert(edge, count)
+        self.counts[edge] = count
+
+        if count > self.max_count:
+            self.max_count = count
+        while self.max_count > 0 and self.max_count not in self.buckets:
+            self.max_count -= 1
+
+    def max_edge(self):
+        if not self.counts:
+            return None, 0
+        return self.buckets[self.max_count][0], self.max_count
+
+    def num_at_max(self):
+        return len(self.buckets.get(self.max_count, ()))
+
+    def random_max_edge(self, rng=random):
+        """Pick uniformly among the edges tied for the most crossings."""
+        if not self.counts:
+            return None, 0
+        return rng.choice(self.buckets[self.max_count]), self.max_count
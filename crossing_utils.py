@@ -1,5 +1,11 @@
+import numpy as np
+import instrumentation
+
+
 def check_intersect(line1, line2):
 
+    if instrumentation.enabled:
+        instrumentation.count("intersection_tests")
     (x1, y1), (x2, y2) = line1
     (x3, y3), (x4, y4) = line2
 
@@ -31,37 +37,191 @@ def check_intersect(line1, line2):
     return 0 <= t1 <= 1 and 0 <= t2 <= 1
 
 
+# Above this many edges calculate_crossings switches from testing all pairs
+# to the bucketed grid index, which only tests pairs whose boxes overlap
+GRID_CROSSING_THRESHOLD = 300
+
+# Number of candidate edge pairs handled per vectorized tile; bounds the
+# kernel's temporary memory to a few tens of MB regardless of graph size
+KERNEL_TILE_SIZE = 1 << 18
+
+
+def exact_coordinates(coords):
+    # Integer layouts are tested exactly in int64, anything else in float64
+    coords = np.asarray(coords, dtype=np.float64)
+    if coords.size and np.all(coords == np.rint(coords)) and np.abs(coords).max() < 2 ** 30:
+        return coords.astype(np.int64)
+    return coords
+
+
+def edge_segments(edge_u, edge_v, coords):
+    # Per-edge endpoint indices and coordinates as flat arrays for the kernel
+    return (edge_u, edge_v,
+            coords[edge_u, 0], coords[edge_u, 1],
+            coords[edge_v, 0], coords[edge_v, 1])
+
+
+def edge_pairs_cross(segments, i, j):
+    """Vectorized check_intersect over the edge pairs (i[k], j[k]) of segments."""
+    instrumentation.count("intersection_tests", len(i))
+    u, v, x1, y1, x2, y2 = segments
+    ax, ay, bx, by = x1[i], y1[i], x2[i], y2[i]
+    cx, cy, dx, dy = x1[j], y1[j], x2[j], y2[j]
+
+    v1x, v1y = bx - ax, by - ay
+    v2x, v2y = dx - cx, dy - cy
+    v3x, v3y = cx - ax, cy - ay
+    cross1 = v1x * v2y - v1y * v2x
+    num1 = v3x * v2y - v3y * v2x
+    num2 = v3x * v1y - v3y * v1x
+
+    # 0 <= num / cross1 <= 1 without the division: flip signs so cross1 >= 0
+    negative = cross1 < 0
+    np.negative(cross1, out=cross1, where=negative)
+    np.negative(num1, out=num1, where=negative)
+    np.negative(num2, out=num2, where=negative)
+    hit = ((cross1 != 0) & (num1 >= 0) & (num1 <= cross1) &
+           (num2 >= 0) & (num2 <= cross1))
+
+    # Edges sharing a node or an endpoint position never count; both touch at
+    # an endpoint, so only the geometric hits need checking
+    k = np.flatnonzero(hit)
+    ik, jk = i[k], j[k]
+    adjacent = ((u[ik] == u[jk]) | (u[ik] == v[jk]) | (v[ik] == u[jk]) | (v[ik] == v[jk]) |
+                ((ax[k] == cx[k]) & (ay[k] == cy[k])) | ((ax[k] == dx[k]) & (ay[k] == dy[k])) |
+                ((bx[k] == cx[k]) & (by[k] == cy[k])) | ((bx[k] == dx[k]) & (by[k] == dy[k])))
+    hit[k[adjacent]] = False
+    return hit
+
+
+def _chunks(counts, tile_size):
+    # Split consecutive entries into runs whose counts add up to about tile_size
+    total = np.cumsum(counts)
+    start = 0
+    while start < len(counts):
+        base = total[start - 1] if start else 0
+        stop = max(start + 1, int(np.searchsorted(total, base + tile_size, side='right')))
+        yield start, stop
+        start = stop
+
+
+def all_pair_blocks(num_edges, tile_size):
+    """Every edge index pair i < j as (i, j) arrays, in blocks of whole rows of roughly tile_size pairs."""
+    partners = num_edges - 1 - np.arange(num_edges)
+    for row, end in _chunks(partners, tile_size):
+        rows = np.arange(row, end)
+        counts = partners[row:end]
+        i = np.repeat(rows, counts)
+        offsets = np.arange(len(i)) - np.repeat(np.cumsum(counts) - counts, counts)
+        yield i, i + 1 + offsets
+
+
+def _grid_pair_blocks(edge_u, edge_v, coords, tile_size):
+    # Bucket every edge into each grid cell its bounding box touches and
+    # yield the pairs sharing a cell whose boxes actually overlap
+    p, q = coords[edge_u], coords[edge_v]
+    low = np.minimum(p, q).astype(np.float64)
+    high = np.maximum(p, q).astype(np.float64)
+
+    # Size cells so that an average edge box covers about one cell
+    cell = (high - low).max(axis=1).mean()
+    if cell <= 0:
+        cell = 1.0
+    origin = low.min(axis=0)
+    cell_low = ((low - origin) // cell).astype(np.int64)
+    cell_high = ((high - origin) // cell).astype(np.int64)
+    rows = int(cell_high[:, 1].max()) + 1
+
+    spans = cell_high - cell_low + 1
+    covered = spans[:, 0] * spans[:, 1]
+    edge = np.repeat(np.arange(len(edge_u)), covered)
+    local = np.arange(len(edge)) - np.repeat(np.cumsum(covered) - covered, covered)
+    cell_x = cell_low[edge, 0] + local % spans[edge, 0]
+    cell_y = cell_low[edge, 1] + local // spans[edge, 0]
+    cell_id = cell_x * rows + cell_y
+
+    order = np.argsort(cell_id, kind='stable')
+    edge, cell_id = edge[order], cell_id[order]
+    group_end = np.searchsorted(cell_id, cell_id, side='right')
+    position = np.arange(len(edge))
+    partners = group_end - 1 - position
+
+    # Long edges spread over many cells can make the grid propose more pairs
+    # than it saves; test all pairs once instead
+    num_edges = len(edge_u)
+    if partners.sum() > num_edges * (num_edges - 1) // 4:
+        yield from all_pair_blocks(num_edges, tile_size)
+        return
+
+    # Pair each bucket entry with the entries after it, chunked by entry
+    for start, stop in _chunks(partners, tile_size):
+        counts = partners[start:stop]
+        first = np.repeat(position[start:stop], counts)
+        offsets = np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+        i, j, here = edge[first], edge[first + 1 + offsets], cell_id[first]
+
+        overlap = ((low[i] <= high[j]) & (low[j] <= high[i])).all(axis=1)
+        i, j, here = i[overlap], j[overlap], here[overlap]
+
+        # A pair shares several cells; only keep it in the cell holding the
+        # lower-left corner of the boxes' overlap
+        corner = ((np.maximum(low[i], low[j]) - origin) // cell).astype(np.int64)
+        owner = corner[:, 0] * rows + corner[:, 1]
+        keep = owner == here
+        yield i[keep], j[keep]
+
+
+def batch_crossing_counts(edge_u, edge_v, coords, pair_blocks=None, tile_size=KERNEL_TILE_SIZE):
+    """Per-edge crossing counts for edges given as endpoint index arrays into coords.
+
+    pair_blocks yields (i, j) arrays of candidate edge pairs; every pair is
+    tested at most once. By default all pairs are tested.
+    """
+    edge_u = np.asarray(edge_u, dtype=np.int64)
+    edge_v = np.asarray(edge_v, dtype=np.int64)
+    coords = exact_coordinates(coords)
+    num_edges = len(edge_u)
+    counts = np.zeros(num_edges, dtype=np.int64)
+    if pair_blocks is None:
+        pair_blocks = all_pair_blocks(num_edges, tile_size)
+
+    segments = edge_segments(edge_u, edge_v, coords)
+    for i, j in pair_blocks:
+        for start in range(0, len(i), tile_size):
+            ti, tj = i[start:start + tile_size], j[start:start + tile_size]
+            hit = edge_pairs_cross(segments, ti, tj)
+            counts += np.bincount(ti[hit], minlength=num_edges)
+            counts += np.bincount(tj[hit], minlength=num_edges)
+
+    return counts
+
+
+def edge_crossing_counts(edge_u, edge_v, coords):
+    # Per-edge crossing counts, through the grid index for large edge sets
+    edge_u = np.asarray(edge_u, dtype=np.int64)
+    edge_v = np.asarray(edge_v, dtype=np.int64)
+    coords = exact_coordinates(coords)
+    pair_blocks = None
+    if len(edge_u) > GRID_CROSSING_THRESHOLD:
+        pair_blocks = _grid_pair_blocks(edge_u, edge_v, coords, KERNEL_TILE_SIZE)
+    return batch_crossing_counts(edge_u, edge_v, coords, pair_blocks)
+
+
 def calculate_crossings(graph, pos):
-    crossings = {}
     edges = list(graph.edges())
-
-    # Initialize crossings count for each edge
-    for edge in edges:
-        crossings[edge] = 0
-
-    # Check each pair of edges for intersections
-    for i, edge1 in enumerate(edges):
-        # Get coordinates for first edge
-        start1 = pos[edge1[0]]
-        end1 = pos[edge1[1]]
-        line1 = (start1, end1)
-
-        for j, edge2 in enumerate(edges[i + 1:], i + 1):
-            # Get coordinates for second edge
-            start2 = pos[edge2[0]]
-            end2 = pos[edge2[1]]
-            line2 = (start2, end2)
-
-            # Check if edges share a node
-            if edge1[0] in edge2 or edge1[1] in edge2:
-                continue
-
-            # Check for intersection
-            if check_intersect(line1, line2):
-                crossings[edge1] += 1
-                crossings[edge2] += 1
-
-    return crossings
+    if not edges:
+        return {}
+
+    index = {}
+    for u, v in edges:
+        index.setdefault(u, len(index))
+        index.setdefault(v, len(index))
+    coords = [pos[node] for node in index]
+    edge_u = [index[u] for u, _ in edges]
+    edge_v = [index[v] for _, v in edges]
+    counts = edge_crossing_counts(edge_u, edge_v, coords)
+
+    return {edge: int(count) for edge, count in zip(edges, counts)}
 
 
 def get_edge_with_most_crossings(crossings):
@@ -1,4 +1,3 @@
-import matplotlib.pyplot as plt
 import networkx as nx
 from draw_with_crossings import draw_with_crossings
 from GridSnapper import apply_grid_snapping
@@ -19,6 +18,7 @@ class InitialLayoutDrawer:
         self.draw_initial_layout(graph_data)
 
     def draw_initial_layout(self, graph_data):
+        import matplotlib.pyplot as plt
         pos = {node["id"]: (node["x"], node["y"]) for node in graph_data["nodes"]}
 
         # Apply grid snapping to the computed positions
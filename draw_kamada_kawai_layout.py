@@ -1,12 +1,12 @@
-import matplotlib.pyplot as plt
 import networkx as nx
 import json  # Import JSON to save layout
 from draw_with_crossings import draw_with_crossings
 from GridSnapper import apply_grid_snapping  # Import the grid snapping function
+from stress_layout import seed_layout
 
 
 class KamadaKawaiLayoutDrawer:
-    def __init__(self, graph_data, output_file="kamada_kawai_layout.json"):
+    def __init__(self, graph_data, output_file="kamada_kawai_layout.json", render=True):
         self.G = nx.Graph()
         for node in graph_data["nodes"]:
             self.G.add_node(node["id"])
@@ -18,11 +18,13 @@ class KamadaKawaiLayoutDrawer:
         self.height = graph_data.get('height', 10)  # Default height
 
         self.output_file = output_file  # File to save layout
+        self.render = render  # Without rendering matplotlib is never imported
         self.draw_kamada_kawai_layout()
 
     def draw_kamada_kawai_layout(self):
-        # Compute the Kamada-Kawai layout (values in range [-1,1])
-        pos = nx.kamada_kawai_layout(self.G)
+        # Compute the Kamada-Kawai layout (stress majorization on large graphs,
+        # values in range [-1,1])
+        pos = seed_layout(self.G)
 
         # Map positions from [-1,1] to [0, width] and [0, height]
         for node, (x, y) in pos.items():
@@ -38,10 +40,11 @@ class KamadaKawaiLayoutDrawer:
         self.save_layout(pos)
 
         # Draw the graph with grid-snapped positions
-        draw_with_crossings(self.G, pos, "Kamada-Kawai Grid Snapped Layout", "kamada_kawai_snapped_layout.svg",
-                            "kamada")
-
-        plt.show()
+        if self.render:
+            import matplotlib.pyplot as plt
+            draw_with_crossings(self.G, pos, "Kamada-Kawai Grid Snapped Layout", "kamada_kawai_snapped_layout.svg",
+                                "kamada")
+            plt.show()
 
     def save_layout(self, pos):
         graph_data = {
@@ -1,10 +1,16 @@
-import matplotlib.pyplot as plt
+import json
 import networkx as nx
 import numpy as np
+from graph_core import GraphCore
+from layout_cache import cached_layout
+from planar_drawing import planar_grid_layout
 
 
 class PlanarLayoutDrawer:
-    def __init__(self, graph_data):
+    def __init__(self, graph_data, output_file="planar_graph_layout.json", render=True):
+        self.graph_data = graph_data
+        self.output_file = output_file
+        self.render = render
         self.G = nx.Graph()
         self.node_positions = {}
         self.grid_width = graph_data.get("width", 25)
@@ -105,46 +111,23 @@ class PlanarLayoutDrawer:
                 yield (-d, y)
                 yield (d, y)
 
+    def planar_grid_positions(self):
+        # Crossing-free canonical-ordering drawing scaled into the grid; the
+        # rounded nx.planar_layout is only a fallback
+        core = GraphCore(self.G.nodes(), self.G.edges(), width=self.grid_width, height=self.grid_height)
+        coords = planar_grid_layout(core)
+        if coords is None:
+            return self.scale_layout_to_integer_grid(cached_layout(nx.planar_layout, self.G))
+        return {node: (int(x), int(y)) for node, (x, y) in zip(core.node_ids, coords.tolist())}
+
     def draw_planar_layout(self):
         if self.is_planar:
             print("Graph is planar.")
 
-            # Create figure and axis - now 2x2 grid
-            fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 15))
-
-            # Draw initial graph from input positions
-            initial_pos = self.node_positions
-            nx.draw_networkx_nodes(self.G, initial_pos, node_size=50, node_color="blue", ax=ax1)
-            nx.draw_networkx_edges(self.G, initial_pos, ax=ax1)
-            nx.draw_networkx_labels(self.G, initial_pos, font_size=8, font_color="black", ax=ax1)
-            ax1.set_title("Initial Graph Layout")
-
-            # Draw NetworkX's planar layout
-            pos_original = nx.planar_layout(self.G)
-            nx.draw_networkx_nodes(self.G, pos_original, node_size=50, node_color="blue", ax=ax2)
-            nx.draw_networkx_edges(self.G, pos_original, ax=ax2)
-            nx.draw_networkx_labels(self.G, pos_original, font_size=8, font_color="black", ax=ax2)
-            ax2.set_title("NetworkX's Planar Layout")
-
-            # Get planar layout and scale to integer grid
-            pos_planar = nx.planar_layout(self.G)
-            scaled_pos = self.scale_layout_to_integer_grid(pos_planar)
-
-            # Draw scaled layout
-            nx.draw_networkx_nodes(self.G, scaled_pos, node_size=50, node_color="blue", ax=ax3)
-            nx.draw_networkx_edges(self.G, scaled_pos, ax=ax3)
-            nx.draw_networkx_labels(self.G, scaled_pos, font_size=8, font_color="black", ax=ax3)
-
-            # Add grid to scaled layout plot
-            ax3.grid(True, linestyle='--', alpha=0.3)
-            ax3.set_xticks(range(self.grid_width))
-            ax3.set_yticks(range(self.grid_height))
-            ax3.set_title("Modified Planar Layout")
-            ax3.set_xlim(-1, self.grid_width)
-            ax3.set_ylim(-1, self.grid_height)
-
-            plt.tight_layout()
-            plt.show()
+            scaled_pos = self.planar_grid_positions()
+            self._export_to_json(scaled_pos)
+            if self.render:
+                self._plot(scaled_pos)
 
             # Print integer coordinates
             print("\nNode Coordinates:")
@@ -153,6 +136,42 @@ class PlanarLayoutDrawer:
         else:
             print("Graph is not planar; skipping planar layout.")
 
+    def _plot(self, scaled_pos):
+        import matplotlib.pyplot as plt
+
+        # Create figure and axis - now 2x2 grid
+        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 15))
+
+        # Draw initial graph from input positions
+        initial_pos = self.node_positions
+        nx.draw_networkx_nodes(self.G, initial_pos, node_size=50, node_color="blue", ax=ax1)
+        nx.draw_networkx_edges(self.G, initial_pos, ax=ax1)
+        nx.draw_networkx_labels(self.G, initial_pos, font_size=8, font_color="black", ax=ax1)
+        ax1.set_title("Initial Graph Layout")
+
+        # Draw NetworkX's planar layout
+        pos_original = cached_layout(nx.planar_layout, self.G)
+        nx.draw_networkx_nodes(self.G, pos_original, node_size=50, node_color="blue", ax=ax2)
+        nx.draw_networkx_edges(self.G, pos_original, ax=ax2)
+        nx.draw_networkx_labels(self.G, pos_original, font_size=8, font_color="black", ax=ax2)
+        ax2.set_title("NetworkX's Planar Layout")
+
+        # Draw the crossing-free grid layout
+        nx.draw_networkx_nodes(self.G, scaled_pos, node_size=50, node_color="blue", ax=ax3)
+        nx.draw_networkx_edges(self.G, scaled_pos, ax=ax3)
+        nx.draw_networkx_labels(self.G, scaled_pos, font_size=8, font_color="black", ax=ax3)
+
+        # Add grid to scaled layout plot
+        ax3.grid(True, linestyle='--', alpha=0.3)
+        ax3.set_xticks(range(self.grid_width))
+        ax3.set_yticks(range(self.grid_height))
+        ax3.set_title("Modified Planar Layout")
+        ax3.set_xlim(-1, self.grid_width)
+        ax3.set_ylim(-1, self.grid_height)
+
+        plt.tight_layout()
+        plt.show()
+
     def _export_to_json(self, scaled_pos):
         # Create a copy of the graph data to avoid modifying the original
         export_data = {
@@ -1,14 +1,13 @@
-import matplotlib.pyplot as plt
 import networkx as nx
 import json  # Import JSON to save layout
-from matplotlib import collections
 from crossing_utils import calculate_crossings
 from draw_with_crossings import draw_with_crossings
 from GridSnapper import apply_grid_snapping
+from layout_cache import cached_layout
 
 
 class SpringLayoutDrawer:
-    def __init__(self, graph_data, output_file="spring_layout.json"):
+    def __init__(self, graph_data, output_file="spring_layout.json", render=True):
         self.G = nx.Graph()
         for node in graph_data["nodes"]:
             self.G.add_node(node["id"])
@@ -20,11 +19,12 @@ class SpringLayoutDrawer:
         self.height = graph_data.get('height', 10)  # Default height
 
         self.output_file = output_file  # File to save layout
+        self.render = render  # Without rendering matplotlib is never imported
         self.draw_spring_layout()
 
     def draw_spring_layout(self):
         # Compute the Spring layout (positions are in an arbitrary scale)
-        pos = nx.spring_layout(self.G, scale=2, seed=42)
+        pos = cached_layout(nx.spring_layout, self.G, scale=2, seed=42)
 
         # Normalize positions from range [-1, 1] to [0, width] and [0, height]
         min_x = min(p[0] for p in pos.values())
@@ -45,9 +45,10 @@ class SpringLayoutDrawer:
         self.save_layout(pos)
 
         # Draw the graph with grid-snapped positions
-        draw_with_crossings(self.G, pos, "Spring Layout Grid Snapped", "spring_layout.svg", "spring")
-
-        plt.show()
+        if self.render:
+            import matplotlib.pyplot as plt
+            draw_with_crossings(self.G, pos, "Spring Layout Grid Snapped", "spring_layout.svg", "spring")
+            plt.show()
 
     def save_layout(self, pos):
         graph_data = {
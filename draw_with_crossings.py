@@ -1,9 +1,9 @@
-import matplotlib.pyplot as plt
 import networkx as nx
 from solve_least_crossing import solve_least_crossings
 
 
 def draw_with_crossings(G, pos, title, filename, type, ax=None):
+    import matplotlib.pyplot as plt
     if ax is None:
         fig, ax = plt.subplots(figsize=(8, 8))
 
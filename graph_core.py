@@ -0,0 +1,110 @@
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+
+class GraphCore:
+    """Array-backed graph and layout shared by the optimizers.
+
+    Nodes are addressed by index 0..n-1; node_ids and index map between the
+    JSON ids and those indices. edges is an (E, 2) int32 array, the adjacency
+    is stored in CSR form (indptr, indices) and coords is one (n, 2) array.
+    """
+
+    def __init__(self, node_ids, edges, coords=None, width=10, height=10):
+        self.node_ids = list(node_ids)
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self.width = width
+        self.height = height
+
+        # Collapse duplicate and reversed edges the way nx.Graph does
+        seen = set()
+        edge_list = []
+        for u, v in edges:
+            iu, iv = self.index[u], self.index[v]
+            key = (iu, iv) if iu <= iv else (iv, iu)
+            if key not in seen:
+                seen.add(key)
+                edge_list.append((iu, iv))
+        self.edges = np.array(edge_list, dtype=np.int32).reshape(-1, 2)
+
+        n = len(self.node_ids)
+        if coords is None:
+            coords = np.zeros((n, 2))
+        self.coords = np.array(coords, dtype=np.float64).reshape(n, 2)
+
+        # CSR adjacency, each undirected edge stored in both directions
+        loops = self.edges[:, 0] == self.edges[:, 1]
+        src = np.concatenate([self.edges[:, 0], self.edges[~loops, 1]])
+        dst = np.concatenate([self.edges[:, 1], self.edges[~loops, 0]])
+        order = np.argsort(src, kind='stable')
+        self.indices = dst[order].astype(np.int32)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+
+    @classmethod
+    def from_graph_data(cls, graph_data):
+        nodes = graph_data["nodes"]
+        return cls(
+            [node["id"] for node in nodes],
+            [(edge["source"], edge["target"]) for edge in graph_data["edges"]],
+            [(node.get("x", 0), node.get("y", 0)) for node in nodes],
+            graph_data.get("width", 10),
+            graph_data.get("height", 10),
+        )
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.edges)
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def incident_edges(self):
+        # Edge indices touching each node
+        incident = [[] for _ in self.node_ids]
+        for e, (u, v) in enumerate(self.edges.tolist()):
+            incident[u].append(e)
+            if v != u:
+                incident[v].append(e)
+        return [np.array(edges, dtype=np.int64) for edges in incident]
+
+    def edge_ids(self):
+        # Edges as (source id, target id) tuples, in edge-array order
+        ids = self.node_ids
+        return [(ids[u], ids[v]) for u, v in self.edges.tolist()]
+
+    def adjacency_matrix(self):
+        n = self.num_nodes
+        data = np.ones(len(self.indices))
+        return sp.csr_matrix((data, self.indices, self.indptr), shape=(n, n))
+
+    def to_networkx(self):
+        G = nx.Graph()
+        G.add_nodes_from(self.node_ids)
+        G.add_edges_from(self.edge_ids())
+        return G
+
+    def positions(self):
+        return {node: (x, y) for node, (x, y) in zip(self.node_ids, self.coords.tolist())}
+
+    def set_positions(self, pos):
+        for node, (x, y) in pos.items():
+            self.coords[self.index[node]] = (x, y)
+
+    def set_unit_layout(self, pos):
+        # Map a networkx layout from [-1,1] to [0, width] and [0, height]
+        self.set_positions(pos)
+        self.coords[:, 0] = (self.coords[:, 0] + 1) / 2 * self.width
+        self.coords[:, 1] = (self.coords[:, 1] + 1) / 2 * self.height
+
+    def write_positions(self, graph_data):
+        for node in graph_data["nodes"]:
+            node["x"], node["y"] = self.coords[self.index[node["id"]]].tolist()
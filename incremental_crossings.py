@@ -0,0 +1,148 @@
+import random
+import numpy as np
+from crossing_index import CrossingCountIndex
+from crossing_utils import KERNEL_TILE_SIZE, edge_crossing_counts, edge_pairs_cross, edge_segments
+
+
+class IncrementalCrossingCounter:
+    def __init__(self, core):
+        # Works on the core's coordinate array in place, so accepted moves
+        # need no copying and rollback restores the core as well
+        self.core = core
+        self.edges = core.edge_ids()
+        self.edge_u = core.edges[:, 0].astype(np.int64)
+        self.edge_v = core.edges[:, 1].astype(np.int64)
+        self.coords = core.coords
+        self.incident = core.incident_edges()
+
+        self.segments = edge_segments(self.edge_u, self.edge_v, self.coords)
+        self.counts = edge_crossing_counts(self.edge_u, self.edge_v, self.coords)
+        self.max_index = CrossingCountIndex(self.counts)
+        # Sum of the per-edge counts, twice the total number of crossings
+        self.count_sum = int(self.counts.sum())
+
+        # Moves since the last commit, undone in reverse by rollback
+        self._journal = []
+
+    def crossings(self):
+        return {edge: int(count) for edge, count in zip(self.edges, self.counts)}
+
+    def max_crossings(self):
+        return self.max_index.max_count
+
+    def total_crossings(self):
+        return self.count_sum // 2
+
+    def objective_terms(self):
+        # Max crossings on an edge, edges at that max and total crossings
+        return self.max_index.max_count, self.max_index.num_at_max(), self.count_sum // 2
+
+    def worst_edge(self, rng=random):
+        # Index of a random edge among those tied for the most crossings
+        return self.max_index.random_max_edge(rng)
+
+    def _apply(self, changed, delta):
+        self.counts[changed] += delta
+        self.count_sum += int(delta.sum())
+        for edge, count in zip(changed.tolist(), self.counts[changed].tolist()):
+            self.max_index.update(edge, count)
+
+    def _incident_counts(self, rows):
+        # Crossings of the given edges with every edge, per edge and per
+        # given edge; the rows x edges pairs go through the kernel in
+        # tiles of KERNEL_TILE_SIZE, so a hub needs no deg x E matrix
+        num_edges = len(self.edges)
+        per_edge = np.zeros(num_edges, dtype=np.int64)
+        per_row = np.zeros(len(rows), dtype=np.int64)
+        for start in range(0, len(rows) * num_edges, KERNEL_TILE_SIZE):
+            pairs = np.arange(start, min(start + KERNEL_TILE_SIZE, len(rows) * num_edges))
+            row, j = np.divmod(pairs, num_edges)
+            hit = edge_pairs_cross(self.segments, rows[row], j)
+            per_edge += np.bincount(j[hit], minlength=num_edges)
+            per_row += np.bincount(row[hit], minlength=len(rows))
+        return per_edge, per_row
+
+    def _place(self, node_index, position):
+        self.coords[node_index] = position
+        _, _, x1, y1, x2, y2 = self.segments
+        rows = self.incident[node_index]
+        at_u = rows[self.edge_u[rows] == node_index]
+        at_v = rows[self.edge_v[rows] == node_index]
+        x1[at_u], y1[at_u] = position
+        x2[at_v], y2[at_v] = position
+
+    def move_node(self, node_index, position):
+        rows = self.incident[node_index]
+        old_position = tuple(self.coords[node_index])
+
+        # Incident edges all share the moved node and never cross each other,
+        # so the count changes are exactly the difference of their rows
+        before_edges, before_rows = self._incident_counts(rows)
+        self._place(node_index, position)
+        after_edges, after_rows = self._incident_counts(rows)
+
+        delta = after_edges - before_edges
+        delta[rows] += after_rows - before_rows
+        changed = np.flatnonzero(delta)
+        self._apply(changed, delta[changed])
+
+        self._journal.append((node_index, old_position, changed, delta[changed]))
+
+    def score_candidates(self, node_index, positions):
+        """Max and total crossings of the layout with node_index at each of positions.
+
+        Every candidate's incident edges are tested against the current edges
+        in one batched pass; nothing is moved.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        rows = self.incident[node_index]
+        num_edges = len(self.edges)
+
+        # Counts with the node's incident edges taken out of the layout
+        before_edges, before_rows = self._incident_counts(rows)
+        base = self.counts - before_edges
+        base[rows] -= before_rows
+
+        # Candidate copies of the incident edges go after the real edges
+        u, v, x1, y1, x2, y2 = self.segments
+        at_u = self.edge_u[rows] == node_index
+        at_v = self.edge_v[rows] == node_index
+        max_counts = np.empty(len(positions), dtype=np.int64)
+        totals = np.empty(len(positions), dtype=np.int64)
+        chunk = max(1, KERNEL_TILE_SIZE // max(1, len(rows) * num_edges))
+        for start in range(0, len(positions), chunk):
+            px, py = positions[start:start + chunk, 0:1], positions[start:start + chunk, 1:2]
+            c = len(px)
+            segments = (np.concatenate([u, np.tile(u[rows], c)]),
+                        np.concatenate([v, np.tile(v[rows], c)]),
+                        np.concatenate([x1, np.where(at_u, px, x1[rows]).ravel()]),
+                        np.concatenate([y1, np.where(at_u, py, y1[rows]).ravel()]),
+                        np.concatenate([x2, np.where(at_v, px, x2[rows]).ravel()]),
+                        np.concatenate([y2, np.where(at_v, py, y2[rows]).ravel()]))
+            i = np.repeat(num_edges + np.arange(c * len(rows)), num_edges)
+            j = np.tile(np.arange(num_edges), c * len(rows))
+            after = edge_pairs_cross(segments, i, j).reshape(c, len(rows), num_edges)
+
+            counts = base + after.sum(axis=1, dtype=np.int64)
+            counts[:, rows] += after.sum(axis=2, dtype=np.int64)
+            max_counts[start:start + c] = counts.max(axis=1)
+            totals[start:start + c] = counts.sum(axis=1) // 2
+        return max_counts, totals
+
+    def reset(self, coords):
+        # Jump to a whole new layout with one full recount
+        self.coords[:] = coords
+        self.segments = edge_segments(self.edge_u, self.edge_v, self.coords)
+        self.counts = edge_crossing_counts(self.edge_u, self.edge_v, self.coords)
+        self.max_index = CrossingCountIndex(self.counts)
+        self.count_sum = int(self.counts.sum())
+        self._journal.clear()
+
+    def commit(self):
+        self._journal.clear()
+
+    def rollback(self):
+        while self._journal:
+            node_index, old_position, changed, delta = self._journal.pop()
+            self._place(node_index, old_position)
+            self._apply(changed, -delta)
@@ -0,0 +1,192 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Off by default: phase() then hands out one shared no-op context manager
+# and count() returns straight away. Hot loops check `enabled` themselves
+# before counting. Setting LAYOUT_PROFILE to a file name enables
+# instrumentation for the whole process and writes the report there at exit.
+enabled = False
+
+# Most frequent sampled functions kept in a report
+REPORT_TOP_FUNCTIONS = 30
+
+_NULL_PHASE = contextlib.nullcontext()
+_origin = time.perf_counter()
+_events = []  # (name, start, duration, thread id) of every finished phase
+_counters = Counter()
+_sampler = None
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread every interval seconds from a daemon thread.
+
+    stacks counts collapsed stacks ("outer;...;inner", the format read by
+    flamegraph tools) and functions counts the innermost function of every
+    sample, so both show where the sampled thread spends its time.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.main_thread().ident
+        self.stacks = Counter()
+        self.functions = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.functions[stack[0]] += 1
+            self.stacks[";".join(reversed(stack))] += 1
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class _Phase:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _events.append((self.name, self.start, time.perf_counter() - self.start, threading.get_ident()))
+        return False
+
+
+def enable(sample_interval=None):
+    """Start recording phases and counters, sampling the main thread's
+    stack every sample_interval seconds if given."""
+    global enabled, _sampler
+    enabled = True
+    if sample_interval and (_sampler is None or not _sampler.running):
+        _sampler = SamplingProfiler(sample_interval)
+
+
+def disable():
+    global enabled, _sampler
+    enabled = False
+    if _sampler is not None:
+        _sampler.stop()
+
+
+def reset():
+    # Drop everything recorded so far; a running sampler starts over too
+    global _origin, _sampler
+    _origin = time.perf_counter()
+    _events.clear()
+    _counters.clear()
+    if _sampler is not None:
+        _sampler.stop()
+        _sampler = SamplingProfiler(_sampler.interval, _sampler.thread_id)
+
+
+def phase(name):
+    """Context manager timing one run of the named phase."""
+    return _Phase(name) if enabled else _NULL_PHASE
+
+
+def timed(name):
+    """Decorator timing every call of a function as the named phase."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            with _Phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, amount=1):
+    if enabled:
+        _counters[name] += amount
+
+
+def report():
+    """Recorded phases (calls, total and longest seconds), counters and
+    the most sampled functions of this process as a JSON-ready dict."""
+    phases = {}
+    for name, _, duration, _ in _events:
+        entry = phases.setdefault(name, {"calls": 0, "total_s": 0.0, "max_s": 0.0})
+        entry["calls"] += 1
+        entry["total_s"] += duration
+        entry["max_s"] = max(entry["max_s"], duration)
+    for entry in phases.values():
+        entry["total_s"] = round(entry["total_s"], 6)
+        entry["max_s"] = round(entry["max_s"], 6)
+
+    result = {"wall_s": round(time.perf_counter() - _origin, 6), "phases": phases, "counters": dict(_counters)}
+    if _sampler is not None:
+        result["sample_interval_s"] = _sampler.interval
+        result["samples"] = sum(_sampler.functions.values())
+        result["top_functions"] = dict(_sampler.functions.most_common(REPORT_TOP_FUNCTIONS))
+    return result
+
+
+def chrome_trace():
+    """Phases as complete events and counter totals as counter events of
+    the Trace Event Format read by chrome://tracing and Perfetto."""
+    pid = os.getpid()
+    trace = [{"name": name, "ph": "X", "pid": pid, "tid": tid,
+              "ts": round((start - _origin) * 1e6, 3), "dur": round(duration * 1e6, 3)}
+             for name, start, duration, tid in _events]
+    end = round((time.perf_counter() - _origin) * 1e6, 3)
+    trace.extend({"name": name, "ph": "C", "pid": pid, "ts": end, "args": {name: value}}
+                 for name, value in _counters.items())
+    data = {"traceEvents": trace, "displayTimeUnit": "ms"}
+    if _sampler is not None:
+        data["otherData"] = {"top_functions": dict(_sampler.functions.most_common(REPORT_TOP_FUNCTIONS))}
+    return data
+
+
+def write_report(path, trace_format=None):
+    """Write report() as JSON, or chrome_trace() with trace_format="chrome"
+    (the default for names ending in .trace.json)."""
+    if trace_format is None:
+        trace_format = "chrome" if path.endswith(".trace.json") else "json"
+    data = chrome_trace() if trace_format == "chrome" else report()
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+    print(f"Instrumentation report written to {path}")
+
+
+def write_collapsed_stacks(path):
+    # Sampled stacks, one "stack count" line each, for flamegraph tools
+    if _sampler is None:
+        return
+    with open(path, 'w') as f:
+        for stack, samples in _sampler.stacks.most_common():
+            f.write(f"{stack} {samples}\n")
+
+
+if os.environ.get("LAYOUT_PROFILE"):
+    import atexit
+
+    _interval = os.environ.get("LAYOUT_PROFILE_SAMPLE_MS")
+    enable(float(_interval) / 1000 if _interval else None)
+    atexit.register(write_report, os.environ["LAYOUT_PROFILE"])
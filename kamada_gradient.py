@@ -1,48 +1,70 @@
-import matplotlib.pyplot as plt
-import networkx as nx
 import numpy as np
-from draw_with_crossings import draw_with_crossings
+from barnes_hut import barnes_hut_repulsion
 from GridSnapper import apply_grid_snapping
-from solve_least_crossing import solve_least_crossings
+from graph_core import GraphCore
+import instrumentation
+from stress_layout import seed_layout
 
 
 class GradientLayoutDrawer:
-    def __init__(self, graph_data, alpha=1.0, learning_rate=0.01, max_iter=100):
-        # Create graph
-        self.G = nx.Graph()
-        for node in graph_data["nodes"]:
-            self.G.add_node(node["id"])
-        for edge in graph_data["edges"]:
-            self.G.add_edge(edge["source"], edge["target"])
+    def __init__(self, graph_data, alpha=1.0, learning_rate=0.01, max_iter=100, memory_limit_mb=64,
+                 repulsion="exact", theta=0.5, render=True, run=True):
+        # Compact graph/layout core the optimizer works on; the networkx
+        # graph is only used for seeding, snapping and drawing
+        self.core = GraphCore.from_graph_data(graph_data)
+        self.G = self.core.to_networkx()
 
         # Store width and height from graph data
-        self.width = graph_data.get('width', 10)
-        self.height = graph_data.get('height', 10)
-
-        # Generate Kamada-Kawai layout first
-        pos = nx.kamada_kawai_layout(self.G)
-
-        # Map Kamada-Kawai layout to graph dimensions
-        self.pos = {}
-        for node in self.G.nodes():
-            x, y = pos[node]
-            self.pos[node] = (
-                (x + 1) / 2 * self.width,
-                (y + 1) / 2 * self.height
-            )
+        self.width = self.core.width
+        self.height = self.core.height
 
         self.alpha = alpha
         self.learning_rate = learning_rate
         self.max_iter = max_iter
 
-        self.optimize_layout()
+        # Cap on the temporaries of one block of the all-pairs terms
+        self.memory_limit_mb = memory_limit_mb
+
+        # "exact" sums repulsion over all pairs, "barnes_hut" approximates it
+        # with a quadtree; smaller theta is more accurate and slower
+        if repulsion not in ("exact", "barnes_hut"):
+            raise ValueError(f"Unknown repulsion mode: {repulsion}")
+        self.repulsion = repulsion
+        self.theta = theta
+
+        # With render=False the layout is optimized and snapped without
+        # importing matplotlib
+        self.render = render
+
+        # With run=False seeding and optimization are left to the caller
+        if run:
+            self._generate_kamada_kawai_layout()
+            self.optimize_layout()
+
+    @instrumentation.timed("seed")
+    def _generate_kamada_kawai_layout(self):
+        # Generate Kamada-Kawai layout first (stress majorization on large
+        # graphs) and map it to graph dimensions
+        pos = seed_layout(self.G)
+        self.core.set_unit_layout(pos)
 
     def optimize_layout(self):
-        # Convert positions to numpy array
-        pos_array = np.array([self.pos[node] for node in self.G.nodes()])
+        self.descend()
+
+        # Apply grid snapping
+        self.pos = apply_grid_snapping(self.G, self.core.positions(), self.width, self.height)
+
+        # Draw and analyze crossings
+        if self.render:
+            self.draw_and_analyze_crossings()
+
+    @instrumentation.timed("gradient")
+    def descend(self):
+        # Gradient descent on the core's coordinates in place
+        pos_array = self.core.coords
 
         # Adjacency matrix
-        adjacency_matrix = nx.adjacency_matrix(self.G)
+        adjacency_matrix = self.core.adjacency_matrix()
 
         for iteration in range(self.max_iter):
             # Compute gradient
@@ -56,69 +78,98 @@ class GradientLayoutDrawer:
                 obj_val = self.compute_objective(pos_array, adjacency_matrix)
                 print(f"Iteration {iteration}, Objective Value: {obj_val}")
 
-        # Update positions
-        for i, node in enumerate(self.G.nodes()):
-            self.pos[node] = pos_array[i]
+    def _row_tiles(self, n):
+        # Rows of the n x n pair matrix processed at once; each row needs
+        # about six float64 temporaries of length n
+        rows = int(self.memory_limit_mb * 2 ** 20 // (48 * max(n, 1)))
+        rows = max(1, min(n, rows))
+        for start in range(0, n, rows):
+            yield start, min(n, start + rows)
+
+    @staticmethod
+    def _edge_pairs(adjacency_matrix):
+        # Nonzero adjacency entries (u, v), both directions of every edge
+        coo = adjacency_matrix.tocoo()
+        nonzero = coo.data != 0
+        return coo.row[nonzero], coo.col[nonzero]
+
+    def _repulsion(self, pos_array):
+        # Sum over every other node v of diff[u, v] / dist[u, v] ** 2,
+        # in blocks of rows against all nodes
+        if self.repulsion == "barnes_hut":
+            return barnes_hut_repulsion(pos_array, self.theta)
 
-        # Apply grid snapping
-        self.pos = apply_grid_snapping(self.G, self.pos, self.width, self.height)
+        n = len(pos_array)
+        total = np.zeros_like(pos_array)
+        for start, stop in self._row_tiles(n):
+            diff = pos_array[start:stop, np.newaxis, :] - pos_array[np.newaxis, :, :]
+            dist_sq = np.einsum('ijk,ijk->ij', diff, diff)
 
-        # Draw and analyze crossings
-        self.draw_and_analyze_crossings()
+            # Coincident nodes (and u itself) have diff 0 and contribute nothing
+            dist_sq[dist_sq == 0] = np.inf
+            total[start:stop] = np.einsum('ijk,ij->ik', diff, 1.0 / dist_sq)
+        return total
 
     def compute_gradient(self, pos_array, adjacency_matrix):
         n = len(pos_array)
         gradient = np.zeros_like(pos_array)
+        u, v = self._edge_pairs(adjacency_matrix)
 
-        # Pairwise differences
-        diff = pos_array[:, np.newaxis, :] - pos_array[np.newaxis, :, :]
-        dist = np.linalg.norm(diff, axis=2)
+        diff = pos_array[u] - pos_array[v]
+        dist = np.linalg.norm(diff, axis=1)
 
         # Prevent division by zero
         dist[dist == 0] = 1e-10
 
-        # Gradient for connected edges
-        for u in range(n):
-            for v in range(n):
-                if adjacency_matrix[u, v]:
-                    gradient[u] += diff[u, v] / dist[u, v]
+        # Gradient for connected edges, scattered onto their first endpoint
+        for k in range(2):
+            gradient[:, k] += np.bincount(u, weights=diff[:, k] / dist, minlength=n)
 
-        # Gradient for non-connected edges
-        for u in range(n):
-            for v in range(u + 1, n):
-                if not adjacency_matrix[u, v]:
-                    gradient[u] -= self.alpha * diff[u, v] / (dist[u, v] ** 2)
-                    gradient[v] += self.alpha * diff[u, v] / (dist[u, v] ** 2)
+        # Gradient for non-connected pairs: repulsion from all other nodes
+        # minus the part coming from neighbours
+        repulsion = self._repulsion(pos_array)
+        off_diagonal = u != v
+        for k in range(2):
+            repulsion[:, k] -= np.bincount(u[off_diagonal],
+                                           weights=diff[off_diagonal, k] / dist[off_diagonal] ** 2,
+                                           minlength=n)
+        gradient -= self.alpha * repulsion
 
         return gradient
 
     def compute_objective(self, pos_array, adjacency_matrix):
         n = len(pos_array)
+        u, v = self._edge_pairs(adjacency_matrix)
 
-        # Pairwise differences
-        diff = pos_array[:, np.newaxis, :] - pos_array[np.newaxis, :, :]
-        dist = np.linalg.norm(diff, axis=2)
+        dist = np.linalg.norm(pos_array[u] - pos_array[v], axis=1)
 
         # Prevent log(0)
         dist[dist == 0] = 1e-10
 
         # Connected edges term
-        connected_term = 0
-        for u in range(n):
-            for v in range(n):
-                if adjacency_matrix[u, v]:
-                    connected_term += dist[u, v]
-
-        # Non-connected edges term
-        non_connected_term = 0
-        for u in range(n):
-            for v in range(u + 1, n):
-                if not adjacency_matrix[u, v]:
-                    non_connected_term -= self.alpha * np.log(dist[u, v])
+        connected_term = dist.sum()
+
+        # Non-connected pairs term: log distance over all pairs u < v minus
+        # the connected ones
+        log_sum = 0.0
+        for start, stop in self._row_tiles(n):
+            diff = pos_array[start:stop, np.newaxis, :] - pos_array[np.newaxis, :, :]
+            tile = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+            tile[tile == 0] = 1e-10
+            upper = np.arange(n)[np.newaxis, :] > np.arange(start, stop)[:, np.newaxis]
+            log_sum += np.log(tile[upper]).sum()
+        upper_edges = u < v
+        log_sum -= np.log(dist[upper_edges]).sum()
+        non_connected_term = -self.alpha * log_sum
 
         return connected_term + non_connected_term
 
+    @instrumentation.timed("render")
     def draw_and_analyze_crossings(self):
+        import matplotlib.pyplot as plt
+        import networkx as nx
+        from draw_with_crossings import draw_with_crossings
+
         # Prepare position data in the format expected by solve_least_crossings
         pos_for_crossings = {node: list(position) for node, position in self.pos.items()}
 
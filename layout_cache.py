@@ -0,0 +1,95 @@
+import functools
+import hashlib
+import os
+import sys
+import networkx as nx
+import numpy as np
+import instrumentation
+
+# Layouts are stored as .npy coordinate arrays in this directory; an empty
+# LAYOUT_CACHE_DIR disables the cache
+CACHE_DIR = os.environ.get("LAYOUT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "np-no-problem"))
+
+# Least recently used layouts are evicted beyond this total size
+CACHE_MAX_MB = float(os.environ.get("LAYOUT_CACHE_MAX_MB", 256))
+
+# Bumped whenever the cache format changes; edits to a cached layout
+# function's module invalidate its entries through module_digest
+CACHE_VERSION = 1
+
+
+@functools.lru_cache(maxsize=None)
+def module_digest(module_name):
+    """Hash of a module's source file, or "" when it has none."""
+    path = getattr(sys.modules.get(module_name), "__file__", None)
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except (TypeError, OSError):
+        return ""
+
+
+def layout_key(G, algorithm, params, source_digest=""):
+    """Hash of the graph's nodes and edges (in order), the algorithm, its
+    parameters and source_digest, the hash of the algorithm's source.
+
+    Node and edge order is part of the key because layouts such as
+    Kamada-Kawai start from a node-ordered initial placement.
+    """
+    digest = hashlib.sha256()
+    for part in (CACHE_VERSION, nx.__version__, algorithm, source_digest, sorted(params.items()),
+                 list(G.nodes()), list(G.edges())):
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _evict(directory, max_bytes):
+    # Remove the least recently used layouts until the cache fits
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".npy"):
+            try:
+                stat = os.stat(os.path.join(directory, name))
+            except FileNotFoundError:  # Evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cached_layout(layout_function, G, **params):
+    """layout_function(G, **params) as {node: (x, y)}, through the on-disk cache."""
+    nodes = list(G.nodes())
+    if not CACHE_DIR or not nodes:
+        return {node: tuple(p) for node, p in layout_function(G, **params).items()}
+
+    algorithm = f"{layout_function.__module__}.{layout_function.__qualname__}"
+    key = layout_key(G, algorithm, params, module_digest(layout_function.__module__))
+    path = os.path.join(CACHE_DIR, key + ".npy")
+    try:
+        coords = np.load(path)
+        os.utime(path)  # Hits refresh the entry's place in the LRU order
+        print(f"Layout cache hit for {algorithm}")
+        instrumentation.count("layout_cache_hits")
+    except (FileNotFoundError, ValueError, OSError):
+        instrumentation.count("layout_cache_misses")
+        pos = layout_function(G, **params)
+        coords = np.array([pos[node] for node in nodes], dtype=np.float64).reshape(len(nodes), 2)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                np.save(f, coords)
+            os.replace(temp_path, path)
+            _evict(CACHE_DIR, CACHE_MAX_MB * 2 ** 20)
+        except OSError as error:  # A read-only or full disk only loses the caching
+            print(f"Layout cache not written: {error}")
+    return {node: (x, y) for node, (x, y) in zip(nodes, coords.tolist())}
@@ -0,0 +1,438 @@
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+from urllib.parse import parse_qs, urlsplit
+from main import KILL_GRACE_FACTOR, KILL_GRACE_SECONDS
+
+# Annealer settings a job may pass in its query string
+JOB_OPTIONS = {
+    "max_iterations": int,
+    "initial_temp": float,
+    "cooling_rate": float,
+    "num_candidates": int,
+    "candidate_selection": str,
+    "objective": str,
+    "use_points": lambda value: value.lower() in ("1", "true", "yes"),
+}
+
+# Seconds a cancelled job gets to stop on its own before its worker is
+# killed and replaced (seeding cannot be interrupted)
+CANCEL_GRACE_SECONDS = 5
+
+# Finished jobs kept for status and result queries
+MAX_FINISHED_JOBS = 256
+
+# Loaded by every worker at start so the first request pays no import or
+# first-call costs
+WARMUP_GRAPH = {
+    "nodes": [{"id": i, "x": 0, "y": 0} for i in range(5)],
+    "edges": [{"source": i, "target": j} for i in range(5) for j in range(i + 1, 5)],
+    "width": 10,
+    "height": 10,
+}
+
+# Workers are spawned rather than forked, since the server has threads
+# running when it replaces a worker
+PROCESS_CONTEXT = multiprocessing.get_context("spawn")
+
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                409: "Conflict", 413: "Payload Too Large"}
+MAX_BODY_BYTES = 256 * 2 ** 20
+
+
+def _worker_main(conn, cancel):
+    # Worker process: warm up once, then run jobs until told to stop. The
+    # annealer's console output goes nowhere; progress travels over conn
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        from simluated_annealing import SimulatedAnnealingDrawer
+        SimulatedAnnealingDrawer(WARMUP_GRAPH, max_iterations=10, run=False).solve()
+        conn.send(("ready",))
+
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:  # The server went away
+                return
+            if message is None:
+                return
+            job_id, graph_data, options = message
+            seed = options.pop("seed", None)
+            if seed is not None:
+                random.seed(seed)
+                import numpy as np
+                np.random.seed(seed)
+
+            def report(progress):
+                conn.send(("progress", job_id, {key: float(value) if key == "temperature" else int(value)
+                                                for key, value in progress.items()}))
+
+            # The workers already use the CPUs, so components are annealed
+            # in this process, where they see cancellations
+            try:
+                drawer = SimulatedAnnealingDrawer(graph_data, run=False, progress_callback=report,
+                                                  should_stop=cancel.is_set, component_workers=1, **options)
+                drawer.solve()
+                counts = drawer.crossing_counts
+                stats = {"max_crossings": int(counts.max()) if len(counts) else 0,
+                         "total_crossings": int(counts.sum()) // 2}
+                conn.send(("done", job_id, drawer.layout_json(), stats))
+            except Exception as error:
+                conn.send(("error", job_id, repr(error)))
+
+
+class Job:
+    def __init__(self, job_id, graph_data, options, deadline=None):
+        # deadline is in seconds from submission, queueing included
+        self.id = job_id
+        self.graph_data = graph_data
+        self.options = options
+        self.submitted = time.time()
+        self.deadline = self.submitted + deadline if deadline is not None else None
+        self.status = "queued"  # then running, and done, cancelled, failed or expired
+        self.started = None
+        self.finished = None
+        self.progress = None
+        self.stats = None
+        self.result = None
+        self.error = None
+        self.cancel_requested = None
+        self.worker = None
+        self.events = []  # Progress and status updates in order, for streaming
+        self.changed = asyncio.Condition()
+
+    @property
+    def finished_status(self):
+        return self.status in ("done", "cancelled", "failed", "expired")
+
+    def summary(self):
+        summary = {"id": self.id, "status": self.status, "submitted": self.submitted}
+        for key in ("deadline", "started", "finished", "progress", "stats", "error"):
+            if getattr(self, key) is not None:
+                summary[key] = getattr(self, key)
+        return summary
+
+    async def publish(self, event):
+        self.events.append(event)
+        async with self.changed:
+            self.changed.notify_all()
+
+
+class Worker:
+    """One warm worker process and the thread that reads its messages."""
+
+    def __init__(self, server):
+        self.server = server
+        self.conn, child_conn = PROCESS_CONTEXT.Pipe()
+        self.cancel = PROCESS_CONTEXT.Event()
+        self.process = PROCESS_CONTEXT.Process(target=_worker_main, args=(child_conn, self.cancel))
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.job = None
+        self.reader = asyncio.ensure_future(self._read())
+
+    async def _read(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                message = await loop.run_in_executor(self.server.readers, self.conn.recv)
+            except (EOFError, OSError):
+                await self.server.worker_exited(self)
+                return
+            await self.server.handle_message(self, message)
+
+    def run(self, job, options):
+        self.cancel.clear()
+        self.job = job
+        self.conn.send((job.id, job.graph_data, options))
+
+    def kill(self):
+        # The reader sees the pipe close and has the worker replaced
+        self.process.terminate()
+        self.process.join()
+
+    def stop(self):
+        with contextlib.suppress(OSError):
+            self.conn.send(None)
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class LayoutServer:
+    """Queue of layout jobs run by a pool of warm annealer worker processes.
+
+    Jobs start in submission order on the first idle worker. A job's
+    deadline bounds its queueing plus annealing time; the annealer keeps
+    its best layout when the time is up, and a worker still busy well past
+    the deadline, or a cancelled job still running after
+    CANCEL_GRACE_SECONDS, has its worker replaced.
+    """
+
+    def __init__(self, num_workers=None):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.readers = concurrent.futures.ThreadPoolExecutor(max_workers=2 * self.num_workers + 2)
+        self.jobs = {}
+        self.finished = collections.deque()
+        self.queue = collections.deque()
+        self.ids = itertools.count(1)
+        self.workers = []
+        self.watchdog = None
+
+    def start(self):
+        self.workers = [Worker(self) for _ in range(self.num_workers)]
+        self.watchdog = asyncio.ensure_future(self._watch())
+
+    def close(self):
+        self.watchdog.cancel()
+        for worker in self.workers:
+            worker.stop()
+        self.readers.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, graph_data, options, deadline=None):
+        job = Job(str(next(self.ids)), graph_data, options, deadline)
+        self.jobs[job.id] = job
+        self.queue.append(job)
+        self._dispatch()
+        return job
+
+    async def cancel(self, job):
+        if job.status == "queued":
+            self.queue.remove(job)
+            await self._finish(job, "cancelled")
+        elif job.status == "running" and job.cancel_requested is None:
+            job.cancel_requested = time.time()
+            job.worker.cancel.set()
+
+    def _dispatch(self):
+        for worker in self.workers:
+            if not worker.ready or worker.job is not None:
+                continue
+            # Jobs whose deadline passed while queued expire without taking
+            # the worker, which goes to the next live job
+            while self.queue:
+                job = self.queue.popleft()
+                options = dict(job.options)
+                if job.deadline is not None:
+                    remaining = job.deadline - time.time()
+                    if remaining <= 0:
+                        asyncio.ensure_future(self._finish(job, "expired"))
+                        continue
+                    options["time_budget"] = remaining
+                job.status = "running"
+                job.started = time.time()
+                job.worker = worker
+                worker.run(job, options)
+                asyncio.ensure_future(job.publish({"status": "running"}))
+                break
+            if not self.queue:
+                return
+
+    async def handle_message(self, worker, message):
+        kind = message[0]
+        if kind == "ready":
+            worker.ready = True
+        elif kind == "progress":
+            job = self.jobs.get(message[1])
+            if job is not None and not job.finished_status:
+                job.progress = message[2]
+                await job.publish({"progress": message[2]})
+        else:
+            job = worker.job
+            worker.job = None
+            if job is not None:
+                if kind == "done":
+                    job.result, job.stats = message[2], message[3]
+                    await self._finish(job, "cancelled" if job.cancel_requested else "done")
+                else:
+                    job.error = message[2]
+                    await self._finish(job, "failed")
+        self._dispatch()
+
+    async def worker_exited(self, worker):
+        # A killed or crashed worker is replaced by a fresh one
+        if worker in self.workers:
+            self.workers[self.workers.index(worker)] = Worker(self)
+        job, worker.job = worker.job, None
+        if job is not None and not job.finished_status:
+            job.error = job.error or f"worker exited with code {worker.process.exitcode}"
+            await self._finish(job, "cancelled" if job.cancel_requested else "failed")
+
+    async def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        job.graph_data = None
+        await job.publish({"status": status})
+        self.finished.append(job)
+        while len(self.finished) > MAX_FINISHED_JOBS:
+            self.jobs.pop(self.finished.popleft().id, None)
+
+    async def _watch(self):
+        # Replace workers stuck past a deadline or a cancellation
+        while True:
+            await asyncio.sleep(0.5)
+            now = time.time()
+            for worker in list(self.workers):
+                job = worker.job
+                if job is None:
+                    continue
+                overdue = job.deadline is not None and now > job.deadline + KILL_GRACE_SECONDS + \
+                    KILL_GRACE_FACTOR * (job.deadline - job.started)
+                stuck = job.cancel_requested is not None and now > job.cancel_requested + CANCEL_GRACE_SECONDS
+                if overdue or stuck:
+                    job.error = "killed after its deadline" if overdue else "killed after cancellation"
+                    worker.kill()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ("\r\n", "\n", ""):
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                return
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                await _respond(writer, 413, {"error": "request body too large"})
+                return
+            body = await reader.readexactly(length) if length else b""
+            method, target = request_line[0], urlsplit(request_line[1])
+            query = {key: values[-1] for key, values in parse_qs(target.query).items()}
+            await self.route(method, target.path.rstrip("/").split("/")[1:], query, body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            with contextlib.suppress(ConnectionError):
+                writer.close()
+                await writer.wait_closed()
+
+    async def route(self, method, parts, query, body, writer):
+        if parts == ["health"]:
+            await _respond(writer, 200, {"workers": len(self.workers),
+                                         "ready": sum(worker.ready for worker in self.workers),
+                                         "queued": len(self.queue)})
+            return
+        if not parts or parts[0] != "jobs" or len(parts) > 3:
+            await _respond(writer, 404, {"error": "not found"})
+            return
+
+        if len(parts) == 1:
+            if method == "GET":
+                await _respond(writer, 200, [job.summary() for job in self.jobs.values()])
+            elif method == "POST":
+                await self._submit(query, body, writer)
+            else:
+                await _respond(writer, 405, {"error": "use GET or POST"})
+            return
+
+        job = self.jobs.get(parts[1])
+        if job is None:
+            await _respond(writer, 404, {"error": f"no job {parts[1]}"})
+        elif len(parts) == 2 and method == "GET":
+            await _respond(writer, 200, job.summary())
+        elif len(parts) == 2 and method == "DELETE":
+            await self.cancel(job)
+            await _respond(writer, 202, job.summary())
+        elif parts[2:] == ["result"] and method == "GET":
+            if query.get("wait", "0") not in ("0", "false"):
+                await _wait_finished(job)
+            if job.result is None:
+                await _respond(writer, 409, job.summary())
+            else:
+                await _respond(writer, 200, job.result)
+        elif parts[2:] == ["events"] and method == "GET":
+            await self._stream_events(job, writer)
+        else:
+            await _respond(writer, 404, {"error": "not found"})
+
+    async def _submit(self, query, body, writer):
+        try:
+            graph_data = json.loads(body)
+            if not isinstance(graph_data, dict) or "nodes" not in graph_data or "edges" not in graph_data:
+                raise ValueError("expected graph JSON with nodes and edges")
+            options = {name: JOB_OPTIONS[name](value) for name, value in query.items() if name in JOB_OPTIONS}
+            if "seed" in query:
+                options["seed"] = int(query["seed"])
+            deadline = float(query["deadline"]) if "deadline" in query else None
+        except ValueError as error:
+            await _respond(writer, 400, {"error": str(error)})
+            return
+        job = self.submit(graph_data, options, deadline)
+        if query.get("wait", "0") in ("0", "false"):
+            await _respond(writer, 202, job.summary())
+            return
+        await _wait_finished(job)
+        await _respond(writer, 200 if job.result is not None else 409, job.result or job.summary())
+
+    async def _stream_events(self, job, writer):
+        # Newline-delimited JSON, one line per update, until the job ends
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        sent = 0
+        while True:
+            while sent < len(job.events):
+                line = json.dumps(job.events[sent]).encode() + b"\n"
+                writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+                sent += 1
+            await writer.drain()
+            if job.finished_status:
+                break
+            async with job.changed:
+                await job.changed.wait_for(lambda: len(job.events) > sent)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+async def _wait_finished(job):
+    async with job.changed:
+        await job.changed.wait_for(lambda: job.finished_status)
+
+
+async def _respond(writer, status, payload):
+    body = json.dumps(payload).encode()
+    writer.write(f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+
+
+async def serve(host="127.0.0.1", port=8765, unix_socket=None, workers=None):
+    server = LayoutServer(workers)
+    server.start()
+    if unix_socket:
+        listener = await asyncio.start_unix_server(server.handle_connection, path=unix_socket)
+        print(f"Layout server listening on {unix_socket} with {server.num_workers} workers")
+    else:
+        listener = await asyncio.start_server(server.handle_connection, host, port)
+        print(f"Layout server listening on http://{host}:{port} with {server.num_workers} workers")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve layout optimization jobs over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(args.host, args.port, args.unix_socket, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,33 @@
-import os
+import argparse
+import contextlib
+import csv
 import json
-from draw_initial_layout import InitialLayoutDrawer
-from draw_spring_layout import SpringLayoutDrawer
-from draw_kamada_kawai_layout import KamadaKawaiLayoutDrawer
-from draw_planar_layout import PlanarLayoutDrawer
-from kamada_gradient import GradientLayoutDrawer
-from simluated_annealing import SimulatedAnnealingDrawer
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import instrumentation
+from render_layout import RENDER_MODES
+
+# Columns of the consolidated batch results
+RESULT_FIELDS = ["graph", "nodes", "edges", "max_crossings", "total_crossings",
+                 "runtime_s", "peak_memory_mb", "status", "output_file"]
+
+# Extra time a batch worker gets past its budget (seeding is not
+# interruptible) before it is killed
+KILL_GRACE_FACTOR = 0.25
+KILL_GRACE_SECONDS = 10
+
+# Instrumentation report names by format; batch runs prefix them with the graph
+PROFILE_SUFFIXES = {"json": "profile.json", "chrome": "trace.json"}
+
 
 class ScalableGraphDrawer:
-    def __init__(self, filename):
+    def __init__(self, filename, render=True):
         # Load the graph data from the JSON file
         try:
-            with open(filename, 'r') as file:
+            with instrumentation.phase("load"), open(filename, 'r') as file:
                 self.graph_data = json.load(file)
             print(f"File {filename} loaded successfully.")
         except FileNotFoundError:
@@ -21,29 +37,243 @@ class ScalableGraphDrawer:
             print(f"Error: JSON format in the file {filename} is incorrect.")
             return
 
+        # Drawers are imported on use so only the one that runs pays for its
+        # imports
+        # from draw_planar_layout import PlanarLayoutDrawer
         # PlanarLayoutDrawer(self.graph_data)
+        # from draw_initial_layout import InitialLayoutDrawer
         # InitialLayoutDrawer(self.graph_data)
+        # from draw_spring_layout import SpringLayoutDrawer
         # SpringLayoutDrawer(self.graph_data)
+        # from draw_kamada_kawai_layout import KamadaKawaiLayoutDrawer
         # KamadaKawaiLayoutDrawer(self.graph_data)
+        # from kamada_gradient import GradientLayoutDrawer
         # GradientLayoutDrawer(self.graph_data, alpha=1, learning_rate=0.1, max_iter=1000)
-        SimulatedAnnealingDrawer(self.graph_data)
+        from simluated_annealing import SimulatedAnnealingDrawer
+        SimulatedAnnealingDrawer(self.graph_data, render=render)
+
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def run_graph(file_path, output_file, time_budget=None, checkpoint_file=None, checkpoint_interval=60.0,
+              resume=False, profile_file=None, profile_sample_interval=None, component_workers=None):
+    # Optimize one graph headless and report its results as a row; with
+    # resume an existing checkpoint_file is continued instead of reseeding.
+    # With a profile_file the run is instrumented and its report written there.
+    # component_workers caps the processes annealing separate components
+    from simluated_annealing import SimulatedAnnealingDrawer
+    if profile_file:
+        instrumentation.reset()
+        instrumentation.enable(profile_sample_interval)
+    start_time = time.time()
+    row = {"graph": file_path, "output_file": output_file}
+    with instrumentation.phase("load"), open(file_path, 'r') as file:
+        graph_data = json.load(file)
+    row["nodes"] = len(graph_data["nodes"])
+    row["edges"] = len(graph_data["edges"])
+
+    resume_from = checkpoint_file if resume and checkpoint_file and os.path.exists(checkpoint_file) else None
+    drawer = SimulatedAnnealingDrawer(graph_data, output_file=output_file,
+                                      time_budget=time_budget, render=False,
+                                      checkpoint_file=checkpoint_file, checkpoint_interval=checkpoint_interval,
+                                      resume_from=resume_from, component_workers=component_workers)
+    counts = drawer.crossing_counts
+    row["max_crossings"] = int(counts.max()) if len(counts) else 0
+    row["total_crossings"] = int(counts.sum()) // 2
+    row["runtime_s"] = round(time.time() - start_time, 3)
+    row["peak_memory_mb"] = peak_memory_mb()
+    row["status"] = "ok"
+    if time_budget is not None and time.time() - start_time >= time_budget:
+        row["status"] = "timeout"
+    if profile_file:
+        instrumentation.write_report(profile_file)
+        instrumentation.disable()
+    return row
+
+
+def _batch_worker(file_path, output_file, log_file, time_budget, checkpoint_options, profile_options,
+                  component_workers, results):
+    # Runs in its own process so peak memory is per graph and it can be killed
+    with open(log_file, 'a' if checkpoint_options.get("resume") else 'w') as log, \
+            contextlib.redirect_stdout(log):
+        try:
+            row = run_graph(file_path, output_file, time_budget, **checkpoint_options, **profile_options,
+                            component_workers=component_workers)
+        except Exception as error:
+            row = {"graph": file_path, "status": f"error: {error!r}"}
+    results.put(row)
+
+
+def find_graph_files(paths):
+    # Expand directories to the JSON files they contain
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith('.json'))
+        elif path.endswith('.json'):
+            files.append(path)
+        else:
+            print(f"Error: {path} is neither a directory nor a JSON file.")
+    return files
+
+
+def run_batch(files, output_dir, workers=None, time_budget=None, checkpoint_interval=None, resume=False,
+              profile=None, profile_sample_interval=None):
+    """Optimize files in parallel worker processes and return one row per graph.
 
-# Directory containing the graph files
-directory = "testGraph"
+    Each worker gets time_budget seconds and keeps its best layout when the
+    budget runs out; a worker still running past the budget plus a grace
+    period is killed and reported with status "killed". With a
+    checkpoint_interval every graph is checkpointed into output_dir, and
+    resume continues from those checkpoints. With profile ("json" or
+    "chrome") every graph also gets an instrumentation report there.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    # The CPUs are divided among the graphs running at once, so graphs
+    # annealed component by component do not start a full pool each
+    component_workers = max(1, (os.cpu_count() or 1) // max(1, min(workers, len(files))))
+    results = multiprocessing.Queue()
+    pending = list(files)
+    running = {}  # file -> (process, start time)
+    rows = {}
 
-# Check if the directory exists
-if not os.path.isdir(directory):
-    print(f"Error: Directory {directory} not found.")
-else:
-    # List all JSON files in the directory
-    json_files = [f for f in os.listdir(directory) if f.endswith('.json')]
+    while pending or running:
+        while pending and len(running) < workers:
+            file_path = pending.pop(0)
+            name = os.path.splitext(file_path)[0].replace(os.sep, "_").replace("/", "_")
+            checkpoint_options = {}
+            if checkpoint_interval is not None or resume:
+                checkpoint_options = {
+                    "checkpoint_file": os.path.join(output_dir, name + ".checkpoint.json"),
+                    "checkpoint_interval": checkpoint_interval or 60.0,
+                    "resume": resume,
+                }
+            profile_options = {}
+            if profile:
+                profile_options = {
+                    "profile_file": os.path.join(output_dir, f"{name}.{PROFILE_SUFFIXES[profile]}"),
+                    "profile_sample_interval": profile_sample_interval,
+                }
+            process = multiprocessing.Process(
+                target=_batch_worker,
+                args=(file_path, os.path.join(output_dir, name + ".json"),
+                      os.path.join(output_dir, name + ".log"), time_budget, checkpoint_options, profile_options,
+                      component_workers, results))
+            process.start()
+            running[file_path] = (process, time.time())
+            print(f"Started {file_path}")
 
-    # Check if there are any JSON files to process
-    if not json_files:
-        print(f"No JSON files found in {directory}.")
+        try:
+            row = results.get(timeout=0.5)
+            rows[row["graph"]] = row
+            print(f"Finished {row['graph']}: {row['status']}")
+        except queue.Empty:
+            pass
+
+        for file_path, (process, started) in list(running.items()):
+            if file_path in rows:
+                process.join()
+                del running[file_path]
+            elif not process.is_alive() and results.empty():
+                rows[file_path] = {"graph": file_path, "status": f"crashed (exit code {process.exitcode})"}
+                del running[file_path]
+            elif time_budget is not None and \
+                    time.time() - started > time_budget * (1 + KILL_GRACE_FACTOR) + KILL_GRACE_SECONDS:
+                process.terminate()
+                process.join()
+                rows[file_path] = {"graph": file_path, "status": "killed",
+                                   "runtime_s": round(time.time() - started, 3)}
+                del running[file_path]
+                print(f"Killed {file_path} after exceeding its time budget")
+
+    return [rows[file_path] for file_path in files]
+
+
+def write_results(rows, results_file):
+    # One consolidated file: JSON if the name ends in .json, CSV otherwise
+    if results_file.endswith('.json'):
+        with open(results_file, 'w') as f:
+            json.dump(rows, f, indent=4)
     else:
+        with open(results_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({field: row.get(field) for field in RESULT_FIELDS})
+    print(f"Results written to {results_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minimize edge crossings of graph drawings.")
+    parser.add_argument("paths", nargs="*", default=["testGraph"],
+                        help="graph JSON files or directories of them (default: testGraph)")
+    parser.add_argument("--batch", action="store_true",
+                        help="optimize in parallel worker processes and write consolidated results")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--time-budget", type=float, default=None, help="wall-clock seconds per graph")
+    parser.add_argument("--output-dir", default="batch_output", help="directory for layouts and logs")
+    parser.add_argument("--results", default="batch_results.csv", help="results file (.csv or .json)")
+    parser.add_argument("--checkpoint-interval", type=float, default=None,
+                        help="seconds between optimizer checkpoints written to --output-dir (batch mode)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue graphs from their checkpoints in --output-dir (batch mode)")
+    parser.add_argument("--render", choices=RENDER_MODES, default="show",
+                        help="how to render layouts outside batch mode (batch runs never render; "
+                             "use render_layout.py on their output instead)")
+    parser.add_argument("--profile", choices=sorted(PROFILE_SUFFIXES), default=None,
+                        help="write an instrumentation report (phase timings and counters) as JSON or as a "
+                             "Chrome trace; per graph in --output-dir in batch mode, else to profile.json "
+                             "or trace.json")
+    parser.add_argument("--profile-sample-ms", type=float, default=None,
+                        help="also sample the call stack every this many milliseconds for the report")
+    args = parser.parse_args()
+    sample_interval = args.profile_sample_ms / 1000 if args.profile_sample_ms else None
+
+    if args.batch:
+        files = find_graph_files(args.paths)
+        if not files:
+            print("No JSON files found.")
+            return
+        rows = run_batch(files, args.output_dir, args.workers, args.time_budget,
+                         args.checkpoint_interval, args.resume, args.profile, sample_interval)
+        write_results(rows, args.results)
+        return
+
+    if args.profile:
+        instrumentation.enable(sample_interval)
+
+    for directory in args.paths:
+        # Check if the directory exists
+        if not os.path.isdir(directory):
+            print(f"Error: Directory {directory} not found.")
+            continue
+
+        # List all JSON files in the directory
+        json_files = [f for f in os.listdir(directory) if f.endswith('.json')]
+
+        # Check if there are any JSON files to process
+        if not json_files:
+            print(f"No JSON files found in {directory}.")
+            continue
+
         # Iterate over each file and process it
         for graph_file in json_files:
             file_path = os.path.join(directory, graph_file)
             print(f"Starting ScalableGraphDrawer for {file_path}...")
-            ScalableGraphDrawer(file_path)
+            ScalableGraphDrawer(file_path, render=args.render)
+
+    if args.profile:
+        instrumentation.write_report(PROFILE_SUFFIXES[args.profile], args.profile)
+
+
+if __name__ == "__main__":
+    main()
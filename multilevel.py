@@ -0,0 +1,154 @@
+import numpy as np
+from graph_core import GraphCore
+import instrumentation
+
+# Coarsening stops at this many nodes, or when a level shrinks the graph by
+# less than MIN_COARSENING_RATIO
+COARSEST_NODES = 300
+MIN_COARSENING_RATIO = 0.9
+
+
+class CoarseLevel:
+    """One coarsening step: the coarse graph and each fine node's coarse parent."""
+
+    def __init__(self, core, parent, edge_weight, node_weight):
+        self.core = core
+        self.parent = parent
+        self.edge_weight = edge_weight
+        self.node_weight = node_weight
+
+
+def heavy_edge_matching(core, edge_weight, node_weight, rng):
+    """Match every node with at most one neighbor, preferring heavy edges.
+
+    Nodes are visited in random order; each unmatched node pairs with the
+    unmatched neighbor joined by the heaviest edge (the lightest such
+    neighbor on ties) so coarse nodes stay balanced. Returns fine -> coarse.
+    """
+    n = core.num_nodes
+    # Weight of every CSR entry, looked up through the edge each one came from
+    u, v = core.edges[:, 0].astype(np.int64), core.edges[:, 1].astype(np.int64)
+    loops = u == v
+    src = np.concatenate([u, v[~loops]])
+    weight = np.concatenate([edge_weight, edge_weight[~loops]])[np.argsort(src, kind='stable')]
+
+    mate = np.full(n, -1, dtype=np.int64)
+    indptr, indices = core.indptr.tolist(), core.indices.tolist()
+    weight = weight.tolist()
+    node_weight_list = node_weight.tolist()
+    for node in rng.permutation(n).tolist():
+        if mate[node] >= 0:
+            continue
+        best, best_key = node, None
+        for k in range(indptr[node], indptr[node + 1]):
+            other = indices[k]
+            if other != node and mate[other] < 0:
+                key = (weight[k], -node_weight_list[other])
+                if best_key is None or key > best_key:
+                    best, best_key = other, key
+        mate[node] = best
+        mate[best] = node
+
+    # Number the pairs (and singletons) by their lower member
+    leader = np.minimum(np.arange(n), mate)
+    _, parent = np.unique(leader, return_inverse=True)
+    return parent
+
+
+def coarsen(core, edge_weight, node_weight, rng):
+    # Contract a heavy-edge matching; parallel coarse edges merge and add up
+    parent = heavy_edge_matching(core, edge_weight, node_weight, rng)
+    m = int(parent.max()) + 1 if len(parent) else 0
+    cu, cv = parent[core.edges[:, 0]], parent[core.edges[:, 1]]
+    keep = cu != cv
+    low, high = np.minimum(cu[keep], cv[keep]), np.maximum(cu[keep], cv[keep])
+    pairs, inverse = np.unique(low * m + high, return_inverse=True)
+    coarse_weight = np.bincount(inverse, weights=edge_weight[keep], minlength=len(pairs))
+    coarse_edges = np.stack([pairs // m, pairs % m], axis=1)
+
+    coarse = GraphCore(range(m), coarse_edges.tolist(), width=core.width, height=core.height)
+    coarse_node_weight = np.bincount(parent, weights=node_weight, minlength=m)
+    return CoarseLevel(coarse, parent, coarse_weight, coarse_node_weight)
+
+
+def coarsen_hierarchy(core, coarsest_nodes=COARSEST_NODES, seed=0):
+    """Coarsening levels from core down to about coarsest_nodes nodes."""
+    rng = np.random.default_rng(seed)
+    levels = []
+    current = core
+    edge_weight = np.ones(core.num_edges)
+    node_weight = np.ones(core.num_nodes)
+    while current.num_nodes > coarsest_nodes:
+        level = coarsen(current, edge_weight, node_weight, rng)
+        if level.core.num_nodes > MIN_COARSENING_RATIO * current.num_nodes:
+            break
+        levels.append(level)
+        current, edge_weight, node_weight = level.core, level.edge_weight, level.node_weight
+    return levels
+
+
+def refine(core, coords, sweeps=4, step=0.5):
+    # Cheap local refinement: every node moves part of the way towards the
+    # barycenter of its neighbors, all nodes at once
+    degrees = core.degrees()
+    has_neighbors = degrees > 0
+    adjacency = core.adjacency_matrix()
+    for _ in range(sweeps):
+        barycenter = adjacency @ coords
+        barycenter[has_neighbors] /= degrees[has_neighbors, np.newaxis]
+        coords[has_neighbors] += step * (barycenter[has_neighbors] - coords[has_neighbors])
+    return coords
+
+
+def prolong(level, coarse_coords, fine_core, rng, spread=0.25):
+    """Fine coordinates from the coarse ones: children start at their parent,
+    spread apart by a fraction of the typical coarse edge length, then refined."""
+    coords = coarse_coords[level.parent].copy()
+    edges = level.core.edges
+    if len(edges):
+        lengths = np.linalg.norm(coarse_coords[edges[:, 0]] - coarse_coords[edges[:, 1]], axis=1)
+        scale = spread * np.median(lengths)
+    else:
+        scale = spread
+    coords += rng.normal(scale=max(scale, 1e-9), size=coords.shape)
+    return refine(fine_core, coords)
+
+
+@instrumentation.timed("multilevel")
+def multilevel_layout(core, coarsest_nodes=COARSEST_NODES, coarse_iterations=1000, coarse_time_budget=None,
+                      seed=0):
+    """Layout of core in [0, width] x [0, height] by coarsening, annealing the
+    coarsest graph and prolonging the result level by level.
+
+    The coarsest graph is annealed for coarse_iterations, or in anytime mode
+    for coarse_time_budget seconds. Everything else takes about linear time
+    in the size of core.
+    """
+    from simluated_annealing import SimulatedAnnealingDrawer
+
+    rng = np.random.default_rng(seed)
+    levels = coarsen_hierarchy(core, coarsest_nodes, seed)
+    coarsest = levels[-1].core if levels else core
+    print(f"Multilevel: {len(levels)} levels, coarsest graph has {coarsest.num_nodes} nodes")
+
+    # Lay out and crossing-optimize the coarsest graph with the annealer
+    graph_data = {
+        "nodes": [{"id": i, "x": 0, "y": 0} for i in range(coarsest.num_nodes)],
+        "edges": [{"source": u, "target": v} for u, v in coarsest.edges.tolist()],
+        "width": core.width,
+        "height": core.height,
+    }
+    drawer = SimulatedAnnealingDrawer(graph_data, max_iterations=None if coarse_time_budget else coarse_iterations,
+                                      time_budget=coarse_time_budget, use_points=False, multilevel=False,
+                                      run=False)
+    drawer._generate_kamada_kawai_layout()
+    drawer.optimize()
+    coords = drawer.core.coords.copy()
+
+    for depth in range(len(levels) - 1, -1, -1):
+        fine = levels[depth - 1].core if depth > 0 else core
+        coords = prolong(levels[depth], coords, fine, rng)
+
+    coords[:, 0] = np.clip(coords[:, 0], 0, core.width)
+    coords[:, 1] = np.clip(coords[:, 1], 0, core.height)
+    return coords
@@ -0,0 +1,53 @@
+import math
+from collections import defaultdict
+import numpy as np
+
+
+class OccupancyGrid:
+    """Hash grid of node positions for constant-time overlap checks.
+
+    Positions are bucketed into square cells of cell_size. A position is free
+    when no other node lies within min_distance of it, which only needs the
+    3x3 block of cells around it since min_distance <= cell_size.
+    """
+
+    def __init__(self, coords, min_distance=0.1, cell_size=1.0):
+        if min_distance > cell_size:
+            raise ValueError("min_distance must not exceed cell_size")
+        self.min_distance = min_distance
+        self.cell_size = cell_size
+        self.positions = [tuple(p) for p in np.asarray(coords, dtype=np.float64).tolist()]
+        self.cells = defaultdict(set)
+        self.cell_of = []
+        for node, position in enumerate(self.positions):
+            cell = self._cell(position)
+            self.cells[cell].add(node)
+            self.cell_of.append(cell)
+
+    def _cell(self, position):
+        return math.floor(position[0] / self.cell_size), math.floor(position[1] / self.cell_size)
+
+    def is_free(self, position, node=None):
+        # True when no node other than `node` is within min_distance
+        x, y = position
+        cx, cy = self._cell(position)
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for other in self.cells.get((gx, gy), ()):
+                    if other != node:
+                        ox, oy = self.positions[other]
+                        if math.hypot(ox - x, oy - y) <= self.min_distance:
+                            return False
+        return True
+
+    def move(self, node, position):
+        position = (float(position[0]), float(position[1]))
+        self.positions[node] = position
+        cell = self._cell(position)
+        old = self.cell_of[node]
+        if cell != old:
+            self.cells[old].discard(node)
+            if not self.cells[old]:
+                del self.cells[old]
+            self.cells[cell].add(node)
+            self.cell_of[node] = cell
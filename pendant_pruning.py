@@ -0,0 +1,186 @@
+from collections import defaultdict
+import numpy as np
+import networkx as nx
+from scipy.spatial import cKDTree
+from crossing_utils import edge_pairs_cross
+from GridSnapper import GridSnapper, manhattan_ring
+import instrumentation
+
+# Candidate positions are checked for crossings this many at a time; the
+# first crossing-free one is taken, and after MAX_CANDIDATES the one with
+# the fewest crossings
+CANDIDATE_BATCH = 8
+MAX_CANDIDATES = 64
+
+
+def prune_pendant_trees(core):
+    """Strip degree-1 nodes from core until none are left.
+
+    Returns the indices of the remaining nodes and the (node, parent) pairs
+    in removal order, so reinserting them in reverse places every parent
+    before its children. A tree component shrinks to a single node.
+    """
+    neighbors = [set(core.neighbors(i).tolist()) - {i} for i in range(core.num_nodes)]
+    degree = [len(others) for others in neighbors]
+    pruned = np.zeros(core.num_nodes, dtype=bool)
+    removed = []
+    stack = [i for i in range(core.num_nodes) if degree[i] == 1]
+    while stack:
+        node = stack.pop()
+        if pruned[node] or degree[node] != 1:
+            continue
+        parent = next(other for other in neighbors[node] if not pruned[other])
+        pruned[node] = True
+        removed.append((node, parent))
+        degree[parent] -= 1
+        if degree[parent] == 1:
+            stack.append(parent)
+    return np.flatnonzero(~pruned), removed
+
+
+class PendantReinserter:
+    """Places pruned nodes next to their parents, parents first.
+
+    Every pendant tree is drawn radially from the core node it hangs on:
+    depth sets the distance and each subtree gets a share of the widest
+    free angle around the root by its number of leaves, scaled to fit
+    within half the distance to the nearest other core node. Each node then
+    takes the free cell nearest its radial target, by the grid snapper's
+    occupancy and point-on-edge checks, whose edge to the parent crosses
+    the fewest placed edges. Placed edges are kept as flat segment arrays
+    with room for a batch of candidate edges after them, so a batch is
+    checked for crossings in one pass of the crossing kernel.
+    """
+
+    def __init__(self, core, removed):
+        self.core = core
+        placed = np.ones(core.num_nodes, dtype=bool)
+        placed[[node for node, _ in removed]] = False
+
+        capacity = core.num_edges + MAX_CANDIDATES
+        self.u = np.full(capacity, -1, dtype=np.int64)
+        self.v = np.full(capacity, -1, dtype=np.int64)
+        self.xy = np.zeros((4, capacity))
+        self.num_placed = 0
+        for u, v in core.edges[placed[core.edges[:, 0]] & placed[core.edges[:, 1]]].tolist():
+            self._add_edge(u, v)
+
+        G = nx.Graph()
+        G.add_nodes_from(np.flatnonzero(placed).tolist())
+        G.add_edges_from(self.edge_list())
+        positions = {node: core.coords[node].copy() for node in G.nodes()}
+        self.snapper = GridSnapper(G, positions, core.width, core.height)
+        self.snapper.snapped_positions.update(tuple(p) for p in core.coords[placed].tolist())
+
+        self.targets = self._radial_targets(removed, placed)
+        for node, parent in reversed(removed):
+            self._reinsert(node, parent)
+
+    def edge_list(self):
+        return list(zip(self.u[:self.num_placed].tolist(), self.v[:self.num_placed].tolist()))
+
+    def _add_edge(self, u, v):
+        k = self.num_placed
+        self.u[k], self.v[k] = u, v
+        self.xy[:, k] = (*self.core.coords[u], *self.core.coords[v])
+        self.num_placed += 1
+
+    def _radial_targets(self, removed, placed):
+        coords = self.core.coords
+        children = defaultdict(list)
+        for node, parent in reversed(removed):
+            children[parent].append(node)
+        # Leaves and height of every subtree; children are removed before
+        # their parents, so a node without an entry yet is a leaf
+        leaves, height = {}, defaultdict(int)
+        for node, parent in removed:
+            leaves.setdefault(node, 1)
+            leaves[parent] = leaves.get(parent, 0) + leaves[node]
+            height[parent] = max(height[parent], height[node] + 1)
+
+        core_nodes = np.flatnonzero(placed)
+        tree = cKDTree(coords[core_nodes]) if len(core_nodes) > 1 else None
+        targets = {}
+        for root in [node for node in children if placed[node]]:
+            # Widest angle between the root's core edges, or all around
+            angles = sorted(np.arctan2(*(coords[other] - coords[root])[::-1])
+                            for other in self.core.neighbors(root).tolist() if placed[other] and other != root)
+            if angles:
+                gaps = [(b - a) % (2 * np.pi) or 2 * np.pi for a, b in zip(angles, angles[1:] + angles[:1])]
+                k = int(np.argmax(gaps))
+                width = min(gaps[k], np.pi) * 0.8
+                center = angles[k] + gaps[k] / 2
+            else:
+                width, center = 2 * np.pi * (1 - 1 / (leaves[root] + 1)), 0.0
+            reach = min(self.core.width, self.core.height) / 2
+            if tree is not None:
+                distance, _ = tree.query(coords[root], k=2)
+                reach = distance[1] / 2
+            step = max(1.0, reach / max(height[root], 1))
+
+            stack = [(root, center - width / 2, center + width / 2, 0)]
+            while stack:
+                node, low, high, depth = stack.pop()
+                total = sum(leaves[child] for child in children[node])
+                for child in children[node]:
+                    share = (high - low) * leaves[child] / total
+                    angle = low + share / 2
+                    targets[child] = coords[root] + (depth + 1) * step * np.array([np.cos(angle), np.sin(angle)])
+                    # Subtrees stay inside the tangents to the child's circle,
+                    # which keeps the radial drawing of the tree planar
+                    half = min(share / 2, np.arccos((depth + 1) / (depth + 2)))
+                    stack.append((child, angle - half, angle + half, depth + 1))
+                    low += share
+        return targets
+
+    def _crossings(self, node, parent, positions):
+        # Crossings of the edge (node, parent) with node at each position
+        m, c = self.num_placed, len(positions)
+        slots = m + np.arange(c)
+        self.u[slots], self.v[slots] = node, parent
+        self.xy[0, slots], self.xy[1, slots] = positions[:, 0], positions[:, 1]
+        self.xy[2, slots], self.xy[3, slots] = self.core.coords[parent]
+        segments = (self.u, self.v, self.xy[0], self.xy[1], self.xy[2], self.xy[3])
+        i = np.repeat(slots, m)
+        j = np.tile(np.arange(m), c)
+        return edge_pairs_cross(segments, i, j).reshape(c, m).sum(axis=1)
+
+    def _candidates(self, target):
+        # Free cells on the canvas in Manhattan rings around the target
+        x = int(round(min(max(target[0], 0), self.core.width)))
+        y = int(round(min(max(target[1], 0), self.core.height)))
+        for distance in range(max(self.core.width, self.core.height) + 1):
+            for dx, dy in manhattan_ring(distance) if distance else [(0, 0)]:
+                position = (x + dx, y + dy)
+                if (0 <= position[0] <= self.core.width and 0 <= position[1] <= self.core.height
+                        and self.snapper.is_position_legal(position, None)):
+                    yield position
+
+    def _reinsert(self, node, parent):
+        candidates = self._candidates(self.targets[node])
+        best, best_crossings = None, None
+        tried = 0
+        while tried < MAX_CANDIDATES:
+            batch = [c for _, c in zip(range(CANDIDATE_BATCH), candidates)]
+            if not batch:
+                break
+            tried += len(batch)
+            crossings = self._crossings(node, parent, np.array(batch, dtype=np.float64))
+            k = int(np.argmin(crossings))
+            if best is None or crossings[k] < best_crossings:
+                best, best_crossings = batch[k], crossings[k]
+            if best_crossings == 0:
+                break
+
+        if best is None:  # Every cell is taken; overlap the parent's position
+            best = tuple(self.core.coords[parent].tolist())
+        self.core.coords[node] = best
+        self.snapper.add_node(node, best, [parent])
+        self._add_edge(node, parent)
+
+
+@instrumentation.timed("pendant_reinsertion")
+def reinsert_pendants(core, removed):
+    """Place the nodes pruned by prune_pendant_trees into core.coords, next to their parents."""
+    PendantReinserter(core, removed)
+    return core.coords
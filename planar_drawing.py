@@ -0,0 +1,40 @@
+import networkx as nx
+import numpy as np
+from networkx.algorithms.planar_drawing import combinatorial_embedding_to_pos
+from crossing_utils import edge_crossing_counts
+
+
+def planar_grid_layout(core):
+    """Crossing-free straight-line drawing of a planar core on its integer grid.
+
+    The embedding from nx.check_planarity is drawn with the canonical
+    ordering (de Fraysseix-Pach-Pollack) algorithm on a (2n-4) x (n-2) grid
+    and stretched into [0, width] x [0, height], by a whole factor when the
+    grid fits so the drawing stays exact. Returns None when the graph is not
+    planar or the drawing does not survive being squeezed into the canvas.
+    """
+    G = core.to_networkx()
+    is_planar, embedding = nx.check_planarity(G)
+    if not is_planar or core.num_nodes == 0:
+        return None
+
+    pos = combinatorial_embedding_to_pos(embedding)
+    coords = np.array([pos[node] for node in core.node_ids], dtype=np.int64).reshape(-1, 2)
+    coords -= coords.min(axis=0)
+    extent = np.maximum(coords.max(axis=0), 1)
+    canvas = np.array([core.width, core.height])
+
+    scale = np.floor(canvas / extent).astype(np.int64)
+    if (scale >= 1).all():
+        coords = coords * scale
+    else:
+        # The grid is larger than the canvas; rounding may merge nodes or
+        # introduce crossings, which the checks below catch
+        coords = np.rint(coords * (canvas / extent)).astype(np.int64)
+        if len(np.unique(coords, axis=0)) < len(coords):
+            return None
+
+    counts = edge_crossing_counts(core.edges[:, 0], core.edges[:, 1], coords)
+    if len(counts) and counts.max() > 0:
+        return None
+    return coords
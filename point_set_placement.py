@@ -0,0 +1,108 @@
+import random
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial import cKDTree
+
+# Up to this many nodes the bulk assignment is an exact min-cost matching;
+# above it a greedy nearest-free-point pass keeps it near-linear
+EXACT_MATCHING_MAX_NODES = 1000
+
+
+class PointSetPlacer:
+    """Placement of nodes onto a fixed set of allowed points.
+
+    Keeps a KD-tree over the points and which node occupies each point, so
+    relocations to free points and swaps with nearby nodes are cheap lookups.
+    """
+
+    def __init__(self, points):
+        self.points = np.array([(p["x"], p["y"]) for p in points], dtype=np.float64).reshape(-1, 2)
+        self.tree = cKDTree(self.points)
+        self.owner = np.full(len(self.points), -1, dtype=np.int64)  # point -> node index
+        self.assignment = np.zeros(0, dtype=np.int64)  # node index -> point
+
+    def _fit_to_points(self, coords):
+        # Stretch the layout's bounding box onto the points' bounding box
+        coords = np.asarray(coords, dtype=np.float64)
+        low, high = coords.min(axis=0), coords.max(axis=0)
+        p_low, p_high = self.points.min(axis=0), self.points.max(axis=0)
+        span = np.where(high > low, high - low, 1.0)
+        return (coords - low) / span * (p_high - p_low) + p_low
+
+    def assign(self, coords, fit=True):
+        """Map a continuous layout onto distinct points and return their coordinates.
+
+        With fit=False the layout is taken in the points' own coordinates, so a
+        layout that already sits on distinct points keeps its assignment.
+        """
+        n = len(coords)
+        if n > len(self.points):
+            raise ValueError(f"{n} nodes cannot be placed on {len(self.points)} points")
+        target = self._fit_to_points(coords) if fit else np.asarray(coords, dtype=np.float64)
+
+        if n <= EXACT_MATCHING_MAX_NODES:
+            cost = ((target[:, np.newaxis, :] - self.points[np.newaxis, :, :]) ** 2).sum(axis=2)
+            _, assignment = linear_sum_assignment(cost)
+        else:
+            assignment = self._greedy_assignment(target)
+
+        self.set_assignment(assignment)
+        return self.points[self.assignment]
+
+    def set_assignment(self, assignment):
+        self.assignment = np.array(assignment, dtype=np.int64)
+        self.owner[:] = -1
+        self.owner[self.assignment] = np.arange(len(self.assignment))
+
+    def _greedy_assignment(self, target):
+        # Nodes closest to a point claim first; nodes whose nearest points
+        # were all claimed retry in the next round against the free points
+        taken = np.zeros(len(self.points), dtype=bool)
+        assignment = np.full(len(target), -1, dtype=np.int64)
+        nearest, _ = self.tree.query(target)
+        waiting = np.argsort(nearest, kind='stable')
+        while len(waiting):
+            free = np.flatnonzero(~taken)
+            _, candidates = cKDTree(self.points[free]).query(target[waiting], k=min(8, len(free)))
+            candidates = free[candidates.reshape(len(waiting), -1)]
+            for node, options in zip(waiting.tolist(), candidates.tolist()):
+                for point in options:
+                    if not taken[point]:
+                        assignment[node] = point
+                        taken[point] = True
+                        break
+            waiting = waiting[assignment[waiting] < 0]
+        return assignment
+
+    def nearby_points(self, node, k=8):
+        # The k points nearest to the node's current point, itself excluded
+        k = min(k + 1, len(self.points))
+        _, candidates = self.tree.query(self.points[self.assignment[node]], k=k)
+        return [c for c in np.atleast_1d(candidates) if c != self.assignment[node]]
+
+    def free_points_near(self, position, k=8):
+        # Up to k unoccupied points nearest to position
+        _, candidates = self.tree.query(position, k=min(4 * k, len(self.points)))
+        candidates = np.atleast_1d(candidates)
+        return candidates[self.owner[candidates] < 0][:k].tolist()
+
+    def propose(self, node, k=8, rng=random):
+        """A relocation to a free nearby point or a swap with a nearby node.
+
+        Returned as [(node, point), ...]; nothing changes until apply().
+        """
+        candidates = self.nearby_points(node, k)
+        if not candidates:
+            return []
+        point = int(rng.choice(candidates))
+        other = self.owner[point]
+        if other < 0:
+            return [(node, point)]
+        return [(node, point), (int(other), int(self.assignment[node]))]
+
+    def apply(self, moves):
+        for node, _ in moves:
+            self.owner[self.assignment[node]] = -1
+        for node, point in moves:
+            self.assignment[node] = point
+            self.owner[point] = node
@@ -0,0 +1,90 @@
+import argparse
+import json
+import multiprocessing
+import os
+
+# Node labels are only drawn up to this many nodes
+LABEL_MAX_NODES = 200
+
+# How a drawer renders its result: not at all, saved to a file, saved and
+# shown in a window, or saved by a background process from the exported JSON
+RENDER_MODES = ("none", "save", "show", "background")
+
+
+def render_mode(render):
+    # render=True/False from older callers maps to "show"/"none"
+    if render is True:
+        return "show"
+    if render is False or render is None:
+        return "none"
+    if render not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode {render!r}, expected one of {RENDER_MODES}")
+    return render
+
+
+def render_layout(layout_file, image_file=None, title=None, show=False):
+    """Draw a layout JSON ({"nodes": [{"id", "x", "y"}], "edges": [...]}) to an image.
+
+    Edges go into one LineCollection so large graphs render in a single call.
+    """
+    import matplotlib
+    if not show:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    with open(layout_file, 'r') as f:
+        graph_data = json.load(f)
+    pos = {node["id"]: (node["x"], node["y"]) for node in graph_data["nodes"]}
+    segments = [(pos[edge["source"]], pos[edge["target"]]) for edge in graph_data["edges"]]
+
+    fig, ax = plt.subplots(figsize=(10, 10))
+    ax.grid(True, linestyle='--', linewidth=1, color='black')
+    ax.set_axisbelow(True)
+    ax.add_collection(LineCollection(segments, colors='black', linewidths=0.5))
+    xs = [x for x, _ in pos.values()]
+    ys = [y for _, y in pos.values()]
+    ax.scatter(xs, ys, s=30 if len(pos) <= LABEL_MAX_NODES else 4, c='blue', zorder=2)
+    if len(pos) <= LABEL_MAX_NODES:
+        for node, (x, y) in pos.items():
+            ax.annotate(str(node), (x, y), fontsize=8, ha='center', va='center', color='white')
+    ax.autoscale()
+    ax.set_title(title or os.path.basename(layout_file))
+    fig.tight_layout()
+
+    if image_file is None:
+        image_file = os.path.splitext(layout_file)[0] + ".svg"
+    fig.savefig(image_file)
+    if show:
+        plt.show()
+    plt.close(fig)
+    print(f"Layout rendered to {image_file}")
+    return image_file
+
+
+def render_in_background(layout_file, image_file=None, title=None):
+    # The optimizer carries on (or exits) while a separate process renders;
+    # the process is not a daemon, so it still finishes its image
+    process = multiprocessing.Process(target=render_layout, args=(layout_file, image_file, title))
+    process.start()
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render exported layout JSON files to images.")
+    parser.add_argument("layouts", nargs="+", help="layout JSON files")
+    parser.add_argument("--output-dir", default=None, help="directory for the images (default: next to each layout)")
+    parser.add_argument("--format", default="svg", help="image format, e.g. svg or png")
+    parser.add_argument("--show", action="store_true", help="also open each image in a window")
+    args = parser.parse_args()
+
+    for layout_file in args.layouts:
+        name = os.path.splitext(os.path.basename(layout_file))[0] + "." + args.format
+        directory = args.output_dir or os.path.dirname(layout_file)
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+        render_layout(layout_file, os.path.join(directory, name), show=args.show)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,139 +1,574 @@
 import random
 import math
-import networkx as nx
 import numpy as np
 import json
-import matplotlib.pyplot as plt
-from solve_least_crossing import solve_least_crossings
-import networkx as nx
+import os
+from graph_core import GraphCore
+from stress_layout import seed_layout
+from crossing_utils import edge_crossing_counts
+from incremental_crossings import IncrementalCrossingCounter
+from occupancy_index import OccupancyGrid
+from multilevel import multilevel_layout
+from planar_drawing import planar_grid_layout
+from components import optimize_components
+from pendant_pruning import prune_pendant_trees, reinsert_pendants
+from point_set_placement import PointSetPlacer
 from GridSnapper import apply_grid_snapping
+from render_layout import render_in_background, render_mode
+import instrumentation
 import time
 
+# Anytime mode stops early once the best layout has not improved for this
+# many iterations per edge (and at least STALL_MIN_ITERATIONS)
+STALL_ITERATIONS_PER_EDGE = 200
+STALL_MIN_ITERATIONS = 2000
+
+# From this many nodes the seed layout comes from the multilevel pipeline,
+# which gets this share of the time budget for its coarsest graph
+MULTILEVEL_MIN_NODES = 1500
+MULTILEVEL_BUDGET_SHARE = 0.25
+
+# Pendant-tree pruning only pays off when it removes this share of the nodes
+PRUNE_MIN_SHARE = 0.05
+
+# Seconds between progress_callback reports and should_stop polls
+CALLBACK_INTERVAL = 0.5
+
+# Energies moves are accepted on: the max crossings on an edge alone, or
+# (max crossings, edges at that max, total crossings) compared in order or
+# summed with objective_weights, the last two terms per edge of the graph
+OBJECTIVES = ("max", "lexicographic", "weighted")
+OBJECTIVE_WEIGHTS = (1.0, 1.0, 1.0)
+
 
 class SimulatedAnnealingDrawer:
-    def __init__(self, graph_data, max_iterations=1000, initial_temp=100.0, cooling_rate=0.95,
-                 output_file='optimized_graph_layout.json'):
+    def __init__(self, graph_data, max_iterations=None, initial_temp=100.0, cooling_rate=0.95,
+                 output_file='optimized_graph_layout.json', use_points=True, time_budget=None, render=True,
+                 checkpoint_file=None, checkpoint_interval=60.0, resume_from=None, warm_start=None,
+                 final_temp=0.05, stall_iterations=None, num_candidates=0, candidate_selection="best",
+                 multilevel="auto", planar=True, components=True, component_workers=None, prune=True,
+                 progress_callback=None, should_stop=None, objective="max", objective_weights=OBJECTIVE_WEIGHTS,
+                 run=True):
+        # Wall-clock budget in seconds from construction; on expiry the best
+        # layout found so far is kept. With a budget the optimizer runs in
+        # anytime mode: the temperature falls from initial_temp to final_temp
+        # over the remaining time and there is no iteration limit unless
+        # max_iterations is given. Without one, max_iterations defaults to
+        # 1000 and the temperature falls geometrically by cooling_rate.
+        self.time_budget = time_budget
+        self.deadline = time.time() + time_budget if time_budget is not None else None
         self.graph_data = graph_data.copy()  # Create a copy to avoid modifying the original
+        if max_iterations is None and time_budget is None:
+            max_iterations = 1000
         self.max_iterations = max_iterations
         self.temp = initial_temp
         self.cooling_rate = cooling_rate
+        self.final_temp = final_temp
         self.width = graph_data["width"]
         self.height = graph_data["height"]
         self.output_file = output_file
 
-        # Generate initial Kamada-Kawai layout
-        self._generate_kamada_kawai_layout()
-
-        self.G = nx.Graph()
-        self.pos = {}
-        self._load_graph()
-        self.optimize()
-        self.draw("final_graph_layout.svg")
+        # Compact graph/layout core the optimizer works on
+        self.core = GraphCore.from_graph_data(self.graph_data)
+        self.use_points = use_points
+        self.placer = None
+
+        # Committed node positions for the overlap check of random moves
+        self.occupancy = None
+
+        # With num_candidates > 0 every move scores that many candidate
+        # positions for the node in one batched pass and takes the best one
+        # ("best") or samples one by Boltzmann weight ("boltzmann")
+        if candidate_selection not in ("best", "boltzmann"):
+            raise ValueError(f"Unknown candidate selection: {candidate_selection}")
+        self.num_candidates = num_candidates
+        self.candidate_selection = candidate_selection
+
+        # Seed by coarsening, annealing the coarsest graph and prolonging:
+        # True, False, or "auto" for graphs of MULTILEVEL_MIN_NODES or more
+        self.multilevel = multilevel
+
+        # Planar graphs without a point set skip seeding and annealing and
+        # are drawn crossing-free from their planar embedding
+        self.planar = planar
+
+        # Disconnected graphs without a point set are optimized one
+        # connected component at a time in a pool of component_workers
+        # processes and packed into disjoint regions of the canvas;
+        # checkpointed runs anneal the whole graph so they can resume
+        self.components = components
+        self.component_workers = component_workers
+
+        # Without a point set, pendant trees are stripped before seeding, the
+        # remaining core is optimized and the trees are reinserted next to
+        # their attachment points; checkpointed runs anneal the whole graph
+        # so they can resume
+        self.prune = prune
+
+        # While annealing, progress_callback gets a dict of the iteration,
+        # temperature and current and best max crossings, and should_stop()
+        # ends the run early with the best layout, each every CALLBACK_INTERVAL
+        # seconds; components annealed in other processes only stop at
+        # their deadline
+        self.progress_callback = progress_callback
+        self.should_stop = should_stop
+
+        # Under "max" nearly every move leaves the energy unchanged; the
+        # other objectives also see moves that empty the worst edges or
+        # remove crossings elsewhere. The best layout is the one of fewest
+        # max crossings (best_crossings), then of least energy
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}")
+        self.objective = objective
+        self.objective_weights = tuple(objective_weights)
+
+        # Optimizer state, saved to checkpoint_file every checkpoint_interval
+        # seconds; resume_from continues from such a checkpoint and
+        # warm_start starts from an exported layout JSON, both without seeding
+        self.iteration = 0
+        self.best_crossings = None
+        self.best_energy = None
+        self.best_coords = None
+        self.best_assignment = None
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_interval = checkpoint_interval
+        self.resume_from = resume_from
+        self.warm_start = warm_start
+
+        # Anytime runs that stop improving end before the deadline
+        if stall_iterations is None:
+            stall_iterations = max(STALL_MIN_ITERATIONS, STALL_ITERATIONS_PER_EDGE * self.core.num_edges)
+        self.stall_iterations = stall_iterations
+
+        # With run=False the phases below are left to the caller
+        if run:
+            self.run(render)
+
+    def run(self, render=True):
+        # render is one of render_layout.RENDER_MODES; True shows the layout
+        # in a window as before, "none" skips matplotlib entirely
+        mode = render_mode(render)
+        self.solve()
         self._export_to_json()
-
+        if mode == "background":
+            render_in_background(self.output_file, "final_graph_layout.svg",
+                                 "Simulated Annealing Optimized Layout")
+        elif mode != "none":
+            self.draw("final_graph_layout.svg", show=mode == "show")
+
+    def solve(self):
+        # Everything run() does short of exporting and rendering
+        if self.resume_from is not None:
+            self.load_checkpoint(self.resume_from)
+            self.optimize()
+        elif self.warm_start is not None:
+            self._load_warm_start(self.warm_start)
+            self.optimize()
+        elif not (self._planar_fast_path() or self._optimize_components() or self._optimize_pruned_core()):
+            # Generate initial Kamada-Kawai layout
+            self._generate_kamada_kawai_layout()
+            self._place_on_points()
+            self.optimize()
+        self._snap_final_layout()
+
+    def _snap_final_layout(self):
+        # Layouts are exported with integer coordinates, so the annealed
+        # positions go to distinct grid points (point sets already are) and
+        # the reported crossings are those of the exported layout
+        if self.placer is None:
+            positions = apply_grid_snapping(self.core.to_networkx(), self.core.positions(), self.width, self.height)
+            self.core.set_positions(positions)
+        self._set_final_layout(self.core.coords)
+
+    @instrumentation.timed("components")
+    def _optimize_components(self):
+        # A point set is shared by all components, so point-set instances
+        # are annealed as a whole, as are checkpointed runs, whose
+        # checkpoints must cover the whole graph
+        if not self.components or self.checkpoint_file or (self.use_points and self.graph_data.get("points")):
+            return False
+        budget = max(self.deadline - time.time(), 0) if self.deadline is not None else None
+        coords = optimize_components(self.core, self.component_workers, budget, self.should_stop,
+                                     **self._subproblem_options())
+        if coords is None:
+            return False
+        self._set_final_layout(coords)
+        return True
+
+    def _subproblem_options(self):
+        # Settings for drawers solving a part of this graph
+        return dict(max_iterations=self.max_iterations if self.deadline is None else None,
+                    initial_temp=self.temp, cooling_rate=self.cooling_rate, final_temp=self.final_temp,
+                    num_candidates=self.num_candidates, candidate_selection=self.candidate_selection,
+                    multilevel=self.multilevel, planar=self.planar, objective=self.objective,
+                    objective_weights=self.objective_weights)
+
+    @instrumentation.timed("pendant_pruning")
+    def _optimize_pruned_core(self):
+        # Point-set instances are annealed as a whole: the trees cannot be
+        # kept next to their parents once the layout is mapped onto the points
+        if not self.prune or self.checkpoint_file or (self.use_points and self.graph_data.get("points")):
+            return False
+        kept, removed = prune_pendant_trees(self.core)
+        if not removed or len(removed) < PRUNE_MIN_SHARE * self.core.num_nodes:
+            return False
+
+        is_kept = np.zeros(self.core.num_nodes, dtype=bool)
+        is_kept[kept] = True
+        edges = self.core.edges[is_kept[self.core.edges[:, 0]] & is_kept[self.core.edges[:, 1]]]
+        reduced = {
+            "nodes": [{"id": self.core.node_ids[i], "x": 0, "y": 0} for i in kept.tolist()],
+            "edges": [{"source": self.core.node_ids[u], "target": self.core.node_ids[v]} for u, v in edges.tolist()],
+            "width": self.width,
+            "height": self.height,
+        }
+        budget = max(self.deadline - time.time(), 0) if self.deadline is not None else None
+        print(f"Pendant pruning: {len(removed)} nodes removed, optimizing the core of {len(kept)} nodes")
+        drawer = SimulatedAnnealingDrawer(reduced, time_budget=budget, use_points=False, prune=False, run=False,
+                                          progress_callback=self.progress_callback, should_stop=self.should_stop,
+                                          **self._subproblem_options())
+        drawer.solve()
+        self.core.coords[kept] = drawer.core.coords
+
+        start_time = time.time()
+        self._set_final_layout(reinsert_pendants(self.core, removed))
+        print(f"Pendant pruning: {len(removed)} nodes reinserted in {time.time() - start_time:.4f} seconds")
+        return True
+
+    def _set_final_layout(self, coords):
+        # coords become the result as they are, with their crossings recounted
+        self.core.coords[:] = coords
+        self.crossing_counts = edge_crossing_counts(self.core.edges[:, 0], self.core.edges[:, 1], self.core.coords)
+        self.best_crossings = int(self.crossing_counts.max()) if len(self.crossing_counts) else 0
+        self.core.write_positions(self.graph_data)
+
+    @instrumentation.timed("planar")
+    def _planar_fast_path(self):
+        # Planar graphs free to use any grid point get a crossing-free
+        # drawing straight away; point-set instances still need annealing
+        if not self.planar or (self.use_points and self.graph_data.get("points")):
+            return False
+        start_time = time.time()
+        coords = planar_grid_layout(self.core)
+        if coords is None:
+            return False
+        self._set_final_layout(coords)
+        print(f"Planar graph: crossing-free grid drawing in {time.time() - start_time:.4f} seconds")
+        return True
+
+    @instrumentation.timed("place_on_points")
+    def _place_on_points(self, fit=True):
+        # Instances with a "points" array may only place nodes on those points
+        if self.use_points and self.graph_data.get("points"):
+            self.placer = PointSetPlacer(self.graph_data["points"])
+            self.core.coords[:] = self.placer.assign(self.core.coords, fit=fit)
+
+    def _load_warm_start(self, layout_file):
+        # Start from a previously exported layout instead of seeding
+        with open(layout_file, 'r') as f:
+            layout = json.load(f)
+        positions = {node["id"]: (node["x"], node["y"]) for node in layout["nodes"]}
+        missing = [node for node in self.core.node_ids if node not in positions]
+        if missing:
+            raise ValueError(f"Warm-start layout {layout_file} has no position for nodes {missing[:10]}")
+        self.core.set_positions(positions)
+        self._place_on_points(fit=False)
+        print(f"Warm start from {layout_file}")
+
+    @instrumentation.timed("checkpoint")
+    def save_checkpoint(self, checkpoint_file):
+        """Write the full optimizer state, replacing checkpoint_file atomically."""
+        def as_list(array):
+            return array.tolist() if array is not None else None
+
+        state = {
+            "node_ids": self.core.node_ids,
+            "coords": self.core.coords.tolist(),
+            "assignment": as_list(self.placer.assignment) if self.placer is not None else None,
+            "temperature": self.temp,
+            "iteration": self.iteration,
+            "random_state": random.getstate(),
+            "best_crossings": self.best_crossings,
+            "objective": self.objective,
+            "objective_weights": self.objective_weights,
+            "best_energy": self.best_energy,
+            "best_coords": as_list(self.best_coords),
+            "best_assignment": as_list(self.best_assignment),
+        }
+        temp_file = checkpoint_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(temp_file, checkpoint_file)
+
+    def load_checkpoint(self, checkpoint_file):
+        with open(checkpoint_file, 'r') as f:
+            state = json.load(f)
+        if state["node_ids"] != self.core.node_ids:
+            raise ValueError(f"Checkpoint {checkpoint_file} belongs to a different graph")
+
+        self.core.coords[:] = state["coords"]
+        if state["assignment"] is not None:
+            self.placer = PointSetPlacer(self.graph_data["points"])
+            self.placer.set_assignment(state["assignment"])
+        self.temp = state["temperature"]
+        self.iteration = state["iteration"]
+        version, internal, gauss = state["random_state"]
+        random.setstate((version, tuple(internal), gauss))
+        self.best_crossings = state["best_crossings"]
+        # Energies of another objective (or older checkpoints) are recomputed
+        same_objective = state.get("objective", "max") == self.objective and \
+            tuple(state.get("objective_weights", OBJECTIVE_WEIGHTS)) == self.objective_weights
+        if same_objective and state.get("best_energy") is not None:
+            best_energy = state["best_energy"]
+            self.best_energy = tuple(best_energy) if isinstance(best_energy, list) else best_energy
+        if state["best_coords"] is not None:
+            self.best_coords = np.array(state["best_coords"], dtype=np.float64)
+        if state["best_assignment"] is not None:
+            self.best_assignment = np.array(state["best_assignment"], dtype=np.int64)
+        print(f"Resumed from {checkpoint_file} at iteration {self.iteration}")
+
+    @instrumentation.timed("seed")
     def _generate_kamada_kawai_layout(self):
-        # Create a temporary graph for Kamada-Kawai layout
-        G = nx.Graph()
-        for node in self.graph_data["nodes"]:
-            G.add_node(node["id"])
-        for edge in self.graph_data["edges"]:
-            G.add_edge(edge["source"], edge["target"])
-
-        # Compute Kamada-Kawai layout (values in range [-1,1])
-        pos = nx.kamada_kawai_layout(G)
-
-        # Map positions from [-1,1] to [0, width] and [0, height]
-        for node, (x, y) in pos.items():
-            new_x = (x + 1) / 2 * self.width
-            new_y = (y + 1) / 2 * self.height
-
-            # Update node positions in graph_data
-            for graph_node in self.graph_data["nodes"]:
-                if graph_node["id"] == node:
-                    graph_node["x"] = new_x
-                    graph_node["y"] = new_y
-                    break
-
-    def _load_graph(self):
-        for node in self.graph_data["nodes"]:
-            self.G.add_node(node["id"])
-            self.pos[node["id"]] = (node["x"], node["y"])
-            self.G.nodes[node["id"]]["pos"] = self.pos[node["id"]]
-        for edge in self.graph_data["edges"]:
-            self.G.add_edge(edge["source"], edge["target"])
-
-    def _sync_positions_with_graph(self):
-        for node, position in self.pos.items():
-            self.G.nodes[node]["pos"] = position
+        if self.multilevel is True or (self.multilevel == "auto" and self.core.num_nodes >= MULTILEVEL_MIN_NODES):
+            budget = None
+            if self.deadline is not None:
+                budget = MULTILEVEL_BUDGET_SHARE * max(self.deadline - time.time(), 0)
+            self.core.coords[:] = multilevel_layout(self.core, coarse_time_budget=budget)
+            return
+
+        # Compute Kamada-Kawai layout (stress majorization on large graphs,
+        # values in range [-1,1]) and map it to [0, width] and [0, height]
+        pos = seed_layout(self.core.to_networkx())
+        self.core.set_unit_layout(pos)
 
     def _move_node_randomly(self, node, radius=10):
+        if self.occupancy is None:
+            self.occupancy = OccupancyGrid(self.core.coords)
+        x, y = self.core.coords[node].tolist()
         for _ in range(10):  # Try up to 10 times to find a valid position
-            x, y = self.pos[node]
             new_x = max(0, min(self.width, x + random.randint(-radius, radius)))
             new_y = max(0, min(self.height, y + random.randint(-radius, radius)))
 
             # Check if the new position overlaps with another node
-            if all(np.sqrt((self.pos[n][0] - new_x) ** 2 + (self.pos[n][1] - new_y) ** 2) > 0.1 for n in self.pos if
-                   n != node):
+            if self.occupancy.is_free((new_x, new_y), node):
                 return new_x, new_y
 
         # If no valid position found after 10 tries, return the original position
         return x, y
 
-    def _calculate_max_crossings(self, crossings):
-        return max(crossings.values())
-
-    import time  # Import time module at the top
-
+    def _candidate_targets(self, node):
+        # Points or positions to try for node: around its neighbors'
+        # barycenter, in a local window and, off the point set, anywhere
+        coords = self.core.coords
+        neighbors = self.core.neighbors(node)
+        k = self.num_candidates
+        if self.placer is not None:
+            targets = self.placer.free_points_near(coords[node], k - k // 2)
+            if len(neighbors):
+                targets += self.placer.free_points_near(coords[neighbors].mean(axis=0), k // 2)
+            return list(dict.fromkeys(targets))
+
+        x, y = coords[node].tolist()
+        targets = []
+        if len(neighbors):
+            targets.append(tuple(coords[neighbors].mean(axis=0).tolist()))
+        while len(targets) < k // 2 + 1:
+            targets.append((x + random.randint(-10, 10), y + random.randint(-10, 10)))
+        while len(targets) < k:
+            targets.append((random.randint(0, self.width), random.randint(0, self.height)))
+        targets = [(max(0, min(self.width, tx)), max(0, min(self.height, ty))) for tx, ty in targets]
+        return [t for t in targets if self.occupancy.is_free(t, node)]
+
+    def _best_response_moves(self, counter, node):
+        targets = self._candidate_targets(node)
+        if not targets:
+            return []
+        positions = self.placer.points[targets] if self.placer is not None else targets
+        max_counts, totals = counter.score_candidates(node, positions)
+        if self.candidate_selection == "boltzmann":
+            weights = np.exp((max_counts.min() - max_counts) / max(self.temp, 1e-12))
+            choice = random.choices(range(len(targets)), weights=weights.tolist())[0]
+        else:
+            # Fewest max crossings, then fewest crossings in total
+            choice = int(np.lexsort((totals, max_counts))[0])
+        return [(node, targets[choice])]
+
+    def _energy(self, terms):
+        # terms are (max crossings, edges at the max, total crossings)
+        if self.objective == "max":
+            return terms[0]
+        if self.objective == "lexicographic":
+            return terms
+        return self._weighted_energy(terms)
+
+    def _term_weights(self):
+        # Edges at the max and total crossings count per edge of the graph,
+        # so with unit weights no number of edges at the max, and only a
+        # change of as many crossings as there are edges, outweighs a step
+        # of the max
+        max_weight, at_max_weight, total_weight = self.objective_weights
+        num_edges = max(1, self.core.num_edges)
+        return max_weight, at_max_weight / num_edges, total_weight / num_edges
+
+    def _weighted_energy(self, terms):
+        return sum(weight * term for weight, term in zip(self._term_weights(), terms))
+
+    def _accept(self, current_terms, test_terms):
+        # Metropolis test. A lexicographic step back is weighed by its first
+        # differing term alone, so raising the max costs a full step of the
+        # max whatever else improves, and far more than adding an edge at it
+        if self._energy(test_terms) < self._energy(current_terms):
+            return True
+        if self.objective == "max":
+            delta = test_terms[0] - current_terms[0]
+        elif self.objective == "lexicographic":
+            delta = next((weight * (test - current) for weight, current, test
+                          in zip(self._term_weights(), current_terms, test_terms) if test != current), 0)
+        else:
+            delta = self._weighted_energy(test_terms) - self._weighted_energy(current_terms)
+        return random.random() < math.exp(-delta / self.temp)
+
+    @instrumentation.timed("anneal")
     def optimize(self):
         start_time = time.time()  # Start measuring time
 
-        self._sync_positions_with_graph()
-        current_pos, current_crossings_dict, _ = solve_least_crossings(self.G, type="optimized")
-        current_crossings = self._calculate_max_crossings(current_crossings_dict)
-
-        for iteration in range(self.max_iterations):
-            if self.temp <= 0 or current_crossings == 1:  # Stop if crossings reach 1
+        # Crossing state updated incrementally as single nodes move
+        counter = IncrementalCrossingCounter(self.core)
+        current_terms = counter.objective_terms()
+        current_crossings = current_terms[0]
+        current_energy = self._energy(current_terms)
+
+        # Best layout seen so far, restored at the end (carried over on resume)
+        if self.best_coords is None:
+            self.best_crossings = current_crossings
+            self.best_energy = current_energy
+            self.best_coords = self.core.coords.copy()
+            self.best_assignment = self.placer.assignment.copy() if self.placer is not None else None
+        elif self.best_energy is None:
+            counts = edge_crossing_counts(self.core.edges[:, 0], self.core.edges[:, 1], self.best_coords)
+            max_count = int(counts.max()) if len(counts) else 0
+            self.best_energy = self._energy((max_count, int((counts == max_count).sum()), int(counts.sum()) // 2))
+        self.occupancy = OccupancyGrid(self.core.coords) if self.placer is None else None
+        last_checkpoint = last_report = last_callback = time.time()
+        last_improvement = first_iteration = self.iteration
+        accepted = 0
+
+        # Anytime schedule: the temperature follows the fraction of the
+        # remaining budget used, T0 * (T_final / T0) ** progress
+        anytime = self.deadline is not None
+        if anytime:
+            schedule_start = time.time()
+            schedule_length = max(self.deadline - schedule_start, 1e-9)
+            schedule_temp = self.temp
+
+        while self.max_iterations is None or self.iteration < self.max_iterations:
+            if self.temp <= 0 or current_crossings <= 1:  # Stop if crossings reach 1
                 print("Early stopping: Crossing count reached 1.")
                 break
-
-            self._sync_positions_with_graph()
-            new_pos, new_crossings_dict, max_crossing_edge = solve_least_crossings(self.G, type="optimized")
-            if not max_crossing_edge:
+            now = time.time()
+            if anytime and now >= self.deadline:
+                print("Time budget exhausted: keeping the best layout found.")
                 break
+            if anytime and self.iteration - last_improvement >= self.stall_iterations:
+                print(f"No improvement in {self.stall_iterations} iterations: keeping the best layout found.")
+                break
+            if now - last_callback >= CALLBACK_INTERVAL:
+                last_callback = now
+                if self.progress_callback is not None:
+                    self.progress_callback({"iteration": self.iteration, "temperature": self.temp,
+                                            "crossings": current_crossings, "best_crossings": self.best_crossings})
+                if self.should_stop is not None and self.should_stop():
+                    print("Stopped on request: keeping the best layout found.")
+                    break
 
-            new_crossings = self._calculate_max_crossings(new_crossings_dict)
+            max_crossing_edge, _ = counter.worst_edge()
+            if max_crossing_edge is None:
+                break
 
-            source, target = max_crossing_edge
+            source, target = self.core.edges[max_crossing_edge].tolist()
             node_to_move = random.choice([source, target])
 
-            original_position = self.pos[node_to_move]
-            new_position = self._move_node_randomly(node_to_move)
-            self.pos[node_to_move] = new_position
-
-            self._sync_positions_with_graph()
-
-            _, test_crossings_dict, _ = solve_least_crossings(self.G, type="optimized")
-            test_crossings = self._calculate_max_crossings(test_crossings_dict)
-
-            if test_crossings < current_crossings or random.random() < math.exp(
-                    (current_crossings - test_crossings) / self.temp):
-                current_crossings = test_crossings
+            # Moves are (node, point) pairs with a placer, (node, position)
+            # otherwise; without candidates (e.g. no free points) best
+            # response falls back to a single random move
+            moves = self._best_response_moves(counter, node_to_move) if self.num_candidates else []
+            if not moves and self.placer is not None:
+                # Relocate to a free nearby point or swap with a nearby node
+                moves = self.placer.propose(node_to_move)
+            elif not moves:
+                moves = [(node_to_move, self._move_node_randomly(node_to_move))]
+            for node, target in moves:
+                counter.move_node(node, self.placer.points[target] if self.placer is not None else target)
+            test_terms = counter.objective_terms()
+
+            if self._accept(current_terms, test_terms):
+                current_terms = test_terms
+                current_crossings = current_terms[0]
+                current_energy = self._energy(current_terms)
+                accepted += 1
+                counter.commit()
+                if self.placer is not None:
+                    self.placer.apply(moves)
+                else:
+                    # Rejected moves are rolled back, so only accepted ones
+                    # change the occupied positions
+                    for node, position in moves:
+                        self.occupancy.move(node, position)
+                # The max is never traded for a lower energy
+                if (current_crossings, current_energy) < (self.best_crossings, self.best_energy):
+                    self.best_energy = current_energy
+                    self.best_crossings = current_crossings
+                    last_improvement = self.iteration
+                    self.best_coords = self.core.coords.copy()
+                    if self.placer is not None:
+                        self.best_assignment = self.placer.assignment.copy()
             else:
-                self.pos[node_to_move] = original_position
+                counter.rollback()
 
-            self.temp *= self.cooling_rate
-            print(f"Iteration {iteration + 1}, Temperature: {self.temp:.2f}, Current Crossings: {current_crossings}")
-
-        for node in self.graph_data["nodes"]:
-            node_id = node["id"]
-            node["x"], node["y"] = self.pos[node_id]
+            if anytime:
+                progress = min((now - schedule_start) / schedule_length, 1.0)
+                self.temp = schedule_temp * (self.final_temp / schedule_temp) ** progress
+            else:
+                self.temp *= self.cooling_rate
+            self.iteration += 1
+            # Anytime runs can take millions of iterations; report once a second
+            if not anytime or now - last_report >= 1.0:
+                print(f"Iteration {self.iteration}, Temperature: {self.temp:.2f}, Current Crossings: {current_crossings}")
+                last_report = now
+
+            if self.checkpoint_file and now - last_checkpoint >= self.checkpoint_interval:
+                self.save_checkpoint(self.checkpoint_file)
+                last_checkpoint = now
+
+        # The last checkpoint holds the state the loop stopped in, so a
+        # resumed run continues exactly where this one ended
+        if self.checkpoint_file:
+            self.save_checkpoint(self.checkpoint_file)
+
+        if (self.best_crossings, self.best_energy) < (current_crossings, current_energy):
+            counter.reset(self.best_coords)
+            if self.placer is not None:
+                self.placer.set_assignment(self.best_assignment)
+        self.crossing_counts = counter.counts.copy()
+        self.core.write_positions(self.graph_data)
+
+        proposals = self.iteration - first_iteration
+        instrumentation.count("proposals", proposals)
+        instrumentation.count("accepts", accepted)
+        instrumentation.count("rejects", proposals - accepted)
 
         end_time = time.time()  # End measuring time
         runtime = end_time - start_time  # Calculate runtime
         print(f"Optimization complete. Total runtime: {runtime:.4f} seconds")
 
+    @instrumentation.timed("export")
     def _export_to_json(self):
+        with open(self.output_file, 'w') as f:
+            json.dump(self.layout_json(), f, indent=4)
+
+        print(f"Graph layout exported to {self.output_file}")
+
+    def layout_json(self):
         # Create a copy of the graph data to avoid modifying the original
         export_data = {
             "nodes": [
@@ -148,19 +583,21 @@ class SimulatedAnnealingDrawer:
             "width": int(self.width),  # Convert width to standard int
             "height": int(self.height)  # Convert height to standard int
         }
+        if self.placer is not None:
+            export_data["points"] = self.graph_data["points"]
+        return export_data
 
-        with open(self.output_file, 'w') as f:
-            json.dump(export_data, f, indent=4)
-
-        print(f"Graph layout exported to {self.output_file}")
-
-    def draw(self, filename="simulated_annealing_layout.svg"):
+    @instrumentation.timed("render")
+    def draw(self, filename="simulated_annealing_layout.svg", show=True):
         import matplotlib.pyplot as plt
+        import networkx as nx
         plt.figure(figsize=(10, 10))
         plt.grid(True, linestyle='--', linewidth=1, color='black')
         plt.gca().set_axisbelow(True)
-        nx.draw(self.G, self.pos, with_labels=True, node_color='blue', node_size=300, font_size=10, font_weight='bold')
+        nx.draw(self.core.to_networkx(), self.core.positions(), with_labels=True, node_color='blue', node_size=300, font_size=10, font_weight='bold')
         plt.title("Simulated Annealing Optimized Layout")
         plt.tight_layout()
         plt.savefig(filename)
-        plt.show()
\ No newline at end of file
+        if show:
+            plt.show()
+        plt.close()
@@ -1,16 +1,18 @@
 import networkx as nx
 from crossing_utils import calculate_crossings, get_edge_with_most_crossings
+from layout_cache import cached_layout
+from stress_layout import seed_layout
 
 
 def solve_least_crossings(graph, type):
     if type == "initial" or type == "optimized":
         pos = nx.get_node_attributes(graph, 'pos')
     if type == "spring":
-        pos = nx.spring_layout(graph, seed=42)
+        pos = cached_layout(nx.spring_layout, graph, seed=42)
     elif type == "kamada":
-        pos = nx.kamada_kawai_layout(graph)
+        pos = seed_layout(graph)
     elif type == "planar":
-        pos = nx.planar_layout(graph)
+        pos = cached_layout(nx.planar_layout, graph)
 
     # Calculate crossings
     crossings = calculate_crossings(graph, pos)
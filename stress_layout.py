@@ -0,0 +1,118 @@
+import networkx as nx
+import numpy as np
+from scipy.sparse.csgraph import shortest_path
+from layout_cache import cached_layout
+
+# Graphs up to this many nodes are seeded with exact Kamada-Kawai; larger
+# ones use sparse stress majorization, which never builds a full distance matrix
+KAMADA_KAWAI_MAX_NODES = 300
+
+
+def seed_layout(G, seed=42):
+    """Seed layout with the nx.kamada_kawai_layout contract: {node: (x, y)} in [-1, 1].
+
+    Results are kept in the on-disk layout cache, so repeated runs on the
+    same graph skip the computation.
+    """
+    return cached_layout(_seed_layout, G, seed=seed, kamada_kawai_max_nodes=KAMADA_KAWAI_MAX_NODES)
+
+
+def _seed_layout(G, seed, kamada_kawai_max_nodes):
+    if G.number_of_nodes() <= kamada_kawai_max_nodes:
+        return nx.kamada_kawai_layout(G)
+    return stress_majorization_layout(G, seed=seed)
+
+
+def _pivot_distances(adjacency, num_pivots, rng):
+    # BFS from maxmin-spread pivots: each new pivot is the node furthest
+    # from all pivots chosen so far
+    n = adjacency.shape[0]
+    pivots = [int(rng.integers(n))]
+    rows = []
+    nearest = np.full(n, np.inf)
+    while True:
+        dist = shortest_path(adjacency, unweighted=True, directed=False, indices=pivots[-1])
+        rows.append(dist)
+        nearest = np.minimum(nearest, dist)
+        if len(pivots) == num_pivots:
+            break
+        # Unreached components count as furthest so every component gets a pivot
+        candidates = np.where(np.isinf(nearest), np.finfo(float).max, nearest)
+        candidates[pivots] = -1
+        pivots.append(int(np.argmax(candidates)))
+    distances = np.array(rows)
+
+    # Place other components at a finite distance beyond the diameter seen
+    finite = np.isfinite(distances)
+    distances[~finite] = distances[finite].max() + 1 if finite.any() else 1
+    return np.array(pivots), distances
+
+
+def _pivot_mds(distances):
+    # Classical MDS on the double-centered squared pivot distances
+    squared = distances ** 2
+    centered = (squared - squared.mean(axis=0) - squared.mean(axis=1)[:, np.newaxis]
+                + squared.mean()) * -0.5
+    _, values, vectors = np.linalg.svd(centered, full_matrices=False)
+    coords = vectors[:2].T * values[:2]
+    if coords.shape[1] < 2:
+        coords = np.hstack([coords, np.zeros((len(coords), 2 - coords.shape[1]))])
+    return coords
+
+
+def stress_majorization_layout(G, num_pivots=50, iterations=60, seed=42):
+    """Sparse stress majorization seeded by pivot MDS, scaled to [-1, 1].
+
+    Stress is taken over the edges (target length 1) plus every node's
+    distances to the pivots, so memory and time stay O(k * (n + E)).
+    """
+    nodes = list(G.nodes())
+    n = len(nodes)
+    if n <= 2:
+        return nx.kamada_kawai_layout(G)
+
+    rng = np.random.default_rng(seed)
+    adjacency = nx.to_scipy_sparse_array(G, nodelist=nodes, format='csr')
+    pivots, distances = _pivot_distances(adjacency, min(num_pivots, n), rng)
+    coords = _pivot_mds(distances)
+    coords += rng.normal(scale=1e-6 * (np.abs(coords).max() + 1), size=coords.shape)
+
+    # Stress terms (i, j, target distance, weight); edges act on both ends,
+    # pivot terms only move the non-pivot node and stand in for the node
+    # pairs that are not modelled explicitly
+    coo = adjacency.tocoo()
+    keep = coo.row != coo.col
+    term_i = [coo.row[keep]]
+    term_j = [coo.col[keep]]
+    target = [np.ones(keep.sum())]
+    weight = [np.ones(keep.sum())]
+    for pivot, dist in zip(pivots, distances):
+        others = np.flatnonzero(np.arange(n) != pivot)
+        term_i.append(others)
+        term_j.append(np.full(len(others), pivot))
+        target.append(dist[others])
+        weight.append(1.0 / dist[others] ** 2)
+    term_i = np.concatenate(term_i)
+    term_j = np.concatenate(term_j)
+    target = np.concatenate(target)
+    weight = np.concatenate(weight)
+    weight_sum = np.bincount(term_i, weights=weight, minlength=n)
+    moved = weight_sum > 0
+
+    # Localized majorization: every node moves to the weighted average of
+    # where each of its terms wants it, all nodes updated at once
+    for _ in range(iterations):
+        diff = coords[term_i] - coords[term_j]
+        length = np.linalg.norm(diff, axis=1)
+        length[length == 0] = 1e-9
+        wanted = coords[term_j] + diff * (target / length)[:, np.newaxis]
+        update = np.stack([np.bincount(term_i, weights=weight * wanted[:, k], minlength=n)
+                           for k in range(2)], axis=1)
+        coords[moved] = update[moved] / weight_sum[moved, np.newaxis]
+
+    # Same normalisation as networkx layouts: centered, max extent 1
+    coords -= coords.mean(axis=0)
+    extent = np.abs(coords).max()
+    if extent > 0:
+        coords /= extent
+    return {node: (x, y) for node, (x, y) in zip(nodes, coords.tolist())}
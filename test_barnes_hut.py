@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from barnes_hut import barnes_hut_repulsion
+from kamada_gradient import GradientLayoutDrawer
+
+
+def _drawer(num_nodes, num_edges, rng):
+    edges = set()
+    while len(edges) < num_edges:
+        u, v = sorted(rng.choice(num_nodes, 2, replace=False).tolist())
+        edges.add((u, v))
+    graph_data = {
+        "nodes": [{"id": i, "x": 0, "y": 0} for i in range(num_nodes)],
+        "edges": [{"source": u, "target": v} for u, v in sorted(edges)],
+        "width": 100,
+        "height": 100,
+    }
+    return GradientLayoutDrawer(graph_data, render=False, run=False)
+
+
+def _random_layout(num_nodes, rng, coincident=0):
+    points = rng.uniform(0, 100, size=(num_nodes, 2))
+    # Copy some points onto others, as snapped or collapsed layouts have
+    for k in range(coincident):
+        points[k + 1] = points[0] if k % 2 == 0 else points[num_nodes - 1]
+    return points
+
+
+@pytest.mark.parametrize("num_nodes, coincident", [(5, 0), (40, 0), (40, 3), (120, 6)])
+def test_theta_zero_matches_exact_repulsion(num_nodes, coincident):
+    rng = np.random.default_rng(num_nodes + coincident)
+    drawer = _drawer(num_nodes, num_nodes, rng)
+    points = _random_layout(num_nodes, rng, coincident)
+    np.testing.assert_allclose(barnes_hut_repulsion(points, theta=0), drawer._repulsion(points),
+                               rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("num_nodes", [50, 200])
+def test_barnes_hut_gradient_close_to_exact(num_nodes):
+    rng = np.random.default_rng(num_nodes)
+    drawer = _drawer(num_nodes, 2 * num_nodes, rng)
+    points = _random_layout(num_nodes, rng, coincident=2)
+    adjacency = drawer.core.adjacency_matrix()
+
+    expected = drawer.compute_gradient(points, adjacency)
+    drawer.repulsion = "barnes_hut"
+    actual = drawer.compute_gradient(points, adjacency)
+    assert np.linalg.norm(actual - expected) <= 1e-2 * np.linalg.norm(expected)
@@ -0,0 +1,75 @@
+import contextlib
+import json
+import os
+import random
+import numpy as np
+import pytest
+from components import optimize_components, pack_regions
+from crossing_utils import edge_crossing_counts
+from graph_core import GraphCore
+from simluated_annealing import SimulatedAnnealingDrawer
+
+
+def _graph_data(num_nodes, edges, width, height):
+    return {
+        "nodes": [{"id": i, "x": 0, "y": 0} for i in range(num_nodes)],
+        "edges": [{"source": u, "target": v} for u, v in edges],
+        "width": width,
+        "height": height,
+    }
+
+
+def _wheel_with_isolated_nodes(rim, isolated, width, height):
+    # A wheel on rim + 1 nodes followed by isolated nodes
+    edges = [(0, i) for i in range(1, rim + 1)] + [(i, i % rim + 1) for i in range(1, rim + 1)]
+    return _graph_data(rim + 1 + isolated, edges, width, height)
+
+
+@pytest.fixture(autouse=True)
+def no_layout_cache(monkeypatch):
+    monkeypatch.setattr("layout_cache.CACHE_DIR", "")
+    random.seed(0)
+    np.random.seed(0)
+
+
+def _solve(graph_data, **options):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        drawer = SimulatedAnnealingDrawer(graph_data, max_iterations=200, component_workers=1, run=False, **options)
+        drawer.solve()
+    return drawer
+
+
+def test_pack_regions_raises_when_nothing_fits():
+    with pytest.raises(ValueError):
+        pack_regions([1] * 41, 8, 8)
+
+
+def test_many_components_on_small_canvas_fall_back_to_whole_graph():
+    graph_data = _wheel_with_isolated_nodes(19, 40, 8, 8)
+    core = GraphCore.from_graph_data(graph_data)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        assert optimize_components(core, workers=1, max_iterations=50) is None
+
+    drawer = _solve(graph_data)
+    coords = drawer.core.coords
+    assert coords.min() >= 0 and coords[:, 0].max() <= 8 and coords[:, 1].max() <= 8
+
+
+def test_isolated_nodes_share_one_region():
+    graph_data = _wheel_with_isolated_nodes(9, 30, 40, 40)
+    core = GraphCore.from_graph_data(graph_data)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        coords = optimize_components(core, workers=1, max_iterations=50)
+    assert coords is not None
+    assert coords.min() >= 0 and coords[:, 0].max() <= 40 and coords[:, 1].max() <= 40
+    assert len({tuple(p) for p in coords.tolist()}) == core.num_nodes
+    counts = edge_crossing_counts(core.edges[:, 0], core.edges[:, 1], coords)
+    assert counts.max() <= 2
+
+
+def test_checkpointed_runs_anneal_the_whole_graph(tmp_path):
+    checkpoint_file = str(tmp_path / "checkpoint.json")
+    drawer = _solve(_wheel_with_isolated_nodes(9, 30, 40, 40), planar=False, checkpoint_file=checkpoint_file,
+                    checkpoint_interval=0.0)
+    with open(checkpoint_file, 'r') as f:
+        assert len(json.load(f)["node_ids"]) == drawer.core.num_nodes
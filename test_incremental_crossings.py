@@ -0,0 +1,48 @@
+import random
+import numpy as np
+import pytest
+import incremental_crossings
+from crossing_utils import edge_crossing_counts
+from graph_core import GraphCore
+from incremental_crossings import IncrementalCrossingCounter
+
+
+def _hub_graph(num_nodes, num_edges, rng):
+    # Node 0 is joined to every other node, plus random edges among the rest
+    edges = {(0, v) for v in range(1, num_nodes)}
+    while len(edges) < num_edges:
+        u, v = sorted(rng.sample(range(1, num_nodes), 2))
+        edges.add((u, v))
+    return {
+        "nodes": [{"id": i, "x": rng.randint(0, 50), "y": rng.randint(0, 50)} for i in range(num_nodes)],
+        "edges": [{"source": u, "target": v} for u, v in sorted(edges)],
+        "width": 50,
+        "height": 50,
+    }
+
+
+@pytest.mark.parametrize("tile_size", [7, 1 << 18])
+def test_moves_match_full_recount(monkeypatch, tile_size):
+    # Tiles smaller than one row of pairs split every incident edge's row
+    monkeypatch.setattr(incremental_crossings, "KERNEL_TILE_SIZE", tile_size)
+    rng = random.Random(tile_size)
+    core = GraphCore.from_graph_data(_hub_graph(30, 80, rng))
+    counter = IncrementalCrossingCounter(core)
+
+    for step in range(40):
+        node = 0 if step % 4 == 0 else rng.randrange(core.num_nodes)
+        counter.move_node(node, (rng.randint(0, 50), rng.randint(0, 50)))
+        if step % 3 == 0:
+            counter.rollback()
+        else:
+            counter.commit()
+        expected = edge_crossing_counts(core.edges[:, 0], core.edges[:, 1], core.coords)
+        np.testing.assert_array_equal(counter.counts, expected)
+        assert counter.total_crossings() == expected.sum() // 2
+
+    max_counts, totals = counter.score_candidates(0, [(10, 10), (40, 5)])
+    for k, position in enumerate([(10, 10), (40, 5)]):
+        coords = core.coords.copy()
+        coords[0] = position
+        expected = edge_crossing_counts(core.edges[:, 0], core.edges[:, 1], coords)
+        assert (max_counts[k], totals[k]) == (expected.max(), expected.sum() // 2)
@@ -0,0 +1,38 @@
+import importlib
+import sys
+import networkx as nx
+import layout_cache
+
+LAYOUT_MODULE = '''
+calls = []
+
+
+def line_layout(G, spacing):
+    calls.append(spacing)
+    return {node: (spacing * k, {offset}) for k, node in enumerate(G.nodes())}
+'''
+
+
+def _import_layout_module(directory, offset):
+    (directory / "cached_line_layout.py").write_text(LAYOUT_MODULE.replace("{offset}", str(offset)))
+    sys.modules.pop("cached_line_layout", None)
+    layout_cache.module_digest.cache_clear()
+    return importlib.import_module("cached_line_layout")
+
+
+def test_source_changes_invalidate_cached_layouts(tmp_path, monkeypatch):
+    monkeypatch.setattr(layout_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # Both versions of the module have the same size, so no stale bytecode
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    G = nx.path_graph(4)
+
+    module = _import_layout_module(tmp_path, 0)
+    assert layout_cache.cached_layout(module.line_layout, G, spacing=2)[3] == (6.0, 0.0)
+    assert layout_cache.cached_layout(module.line_layout, G, spacing=2)[3] == (6.0, 0.0)
+    assert module.calls == [2]
+
+    module = _import_layout_module(tmp_path, 1)
+    assert layout_cache.cached_layout(module.line_layout, G, spacing=2)[3] == (6.0, 1.0)
+    assert module.calls == [2]
+    sys.modules.pop("cached_line_layout", None)
@@ -0,0 +1,38 @@
+import asyncio
+from layout_server import LayoutServer
+
+
+class IdleWorker:
+    # Stands in for a worker process: records the jobs it is given
+    def __init__(self):
+        self.ready = True
+        self.job = None
+        self.runs = []
+
+    def run(self, job, options):
+        self.job = job
+        self.runs.append((job.id, options))
+
+
+def test_expired_jobs_do_not_leave_a_worker_idle():
+    async def scenario():
+        server = LayoutServer(1)
+        worker = IdleWorker()
+        server.workers = [worker]
+
+        first = server.submit({}, {})
+        expiring = server.submit({}, {}, deadline=0.01)
+        last = server.submit({}, {})
+        assert worker.job is first
+
+        await asyncio.sleep(0.05)
+        worker.job = None  # The first job finished
+        server._dispatch()
+        await asyncio.sleep(0)
+
+        assert expiring.status == "expired"
+        assert last.status == "running" and worker.job is last
+        assert [job_id for job_id, _ in worker.runs] == [first.id, last.id]
+        server.readers.shutdown()
+
+    asyncio.run(scenario())
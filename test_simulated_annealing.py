@@ -0,0 +1,66 @@
+import contextlib
+import json
+import os
+import random
+import numpy as np
+import pytest
+from crossing_utils import edge_crossing_counts
+from simluated_annealing import SimulatedAnnealingDrawer
+
+GRAPH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(autouse=True)
+def no_layout_cache(monkeypatch):
+    monkeypatch.setattr("layout_cache.CACHE_DIR", "")
+    random.seed(0)
+    np.random.seed(0)
+
+
+def _load(name):
+    with open(os.path.join(GRAPH_DIR, name), 'r') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("name", ["benchmark_small/graph2.json", "benchmark_small/graph3.json"])
+def test_reported_crossings_are_those_of_the_exported_layout(name):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        drawer = SimulatedAnnealingDrawer(_load(name), max_iterations=300, run=False)
+        drawer.solve()
+    exported = {node["id"]: (node["x"], node["y"]) for node in drawer.layout_json()["nodes"]}
+    coords = np.array([exported[node] for node in drawer.core.node_ids], dtype=np.float64)
+
+    assert len({tuple(p) for p in coords.tolist()}) == len(coords)
+    counts = edge_crossing_counts(drawer.core.edges[:, 0], drawer.core.edges[:, 1], coords)
+    np.testing.assert_array_equal(counts, drawer.crossing_counts)
+    assert drawer.best_crossings == counts.max()
+
+
+def _drawer(objective, temperature):
+    graph_data = {"nodes": [{"id": i, "x": 0, "y": 0} for i in range(4)],
+                  "edges": [{"source": i, "target": (i + 1) % 4} for i in range(4)],
+                  "width": 10, "height": 10}
+    return SimulatedAnnealingDrawer(graph_data, objective=objective, initial_temp=temperature, run=False)
+
+
+def test_lexicographic_step_back_pays_for_the_higher_max():
+    # One more crossing on the worst edge, many fewer elsewhere: a step
+    # back lexicographically, though far lower in weighted energy
+    drawer = _drawer("lexicographic", 1.0)
+    current, test = (3, 1, 100), (4, 4, 0)
+    assert drawer._weighted_energy(test) < drawer._weighted_energy(current)
+    accepted = sum(drawer._accept(current, test) for _ in range(2000)) / 2000
+    assert accepted == pytest.approx(np.exp(-1.0), abs=0.05)
+
+    drawer.temp = 1e-3
+    assert not any(drawer._accept(current, test) for _ in range(100))
+
+
+def test_lexicographic_order_of_terms():
+    drawer = _drawer("lexicographic", 1e-3)
+    assert drawer._accept((3, 2, 10), (3, 1, 50))
+    assert drawer._accept((3, 2, 10), (2, 9, 90))
+    # Adding an edge at the max costs a quarter step of the max here
+    drawer.temp = 1.0
+    accepted = sum(drawer._accept((3, 1, 10), (3, 2, 10)) for _ in range(2000)) / 2000
+    assert accepted == pytest.approx(np.exp(-0.25), abs=0.05)